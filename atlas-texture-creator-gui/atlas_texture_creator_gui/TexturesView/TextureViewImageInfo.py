@@ -1,6 +1,5 @@
 from copy import deepcopy
 from typing import Callable
-from PIL import Image
 
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QPixmap, QCloseEvent
@@ -8,6 +7,7 @@ from PySide6.QtWidgets import QVBoxLayout, QLabel, QLineEdit, QSpacerItem, QSize
     QDockWidget, QWidget, QFileDialog
 
 from atlas_texture_creator import AtlasTexture
+from atlas_texture_creator.image_size import get_image_size
 from atlas_texture_creator_gui.TexturesView.TextureViewImage import TextureViewImage
 from atlas_texture_creator_gui.utils.image_format import get_supported_image_formats
 
@@ -64,8 +64,8 @@ class TextureViewImageInfo(QDockWidget):
         self.setVisible(True)
 
     def set_texture_size_text(self, image_path: str):
-        img = Image.open(image_path)
-        size_info_text = f"width: {img.width} - height: {img.height}"
+        width, height = get_image_size(image_path)
+        size_info_text = f"width: {width} - height: {height}"
         self.size_info.setText(size_info_text)
 
     def set_texture_coord_text(self, texture: AtlasTexture):
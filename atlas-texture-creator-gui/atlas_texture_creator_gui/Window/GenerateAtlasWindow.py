@@ -1,3 +1,4 @@
+import os
 from typing import Callable
 from PySide6.QtWidgets import QWidget, QHBoxLayout, QLineEdit, QPushButton, QVBoxLayout, QFileDialog, QDialog, \
     QSpacerItem, QSizePolicy, QLabel, QSpinBox, QCheckBox
@@ -45,6 +46,7 @@ class GenerateAtlasWindow(QDialog):
         result: GenerateAtlasReturnType = GenerateAtlasReturnType(
             file_path=save_path,
             lock_size=lock_size,
+            workers=os.cpu_count() or 1,
         )
 
         self.generate_atlas_callback(result)
@@ -1,11 +1,13 @@
 import os
+import re
 import shutil
 from pathlib import Path
 from typing import overload
 from PySide6.QtCore import Signal, QObject, Slot, QRunnable
 from PySide6.QtWidgets import QInputDialog, QMessageBox, QFileDialog, QApplication
 
-from atlas_texture_creator import AtlasManager, AtlasCollection, AtlasTexture, AtlasTextureModel
+from atlas_texture_creator import AtlasManager, AtlasCollection, AtlasTexture, AtlasTextureModel, AtlasManagerConfig, \
+    AtlasManagerConfigDB
 from atlas_texture_creator.atlas_collection import AtlasCollectionTextureStore
 from atlas_texture_creator_gui.Window.GenerateAtlasWindow import GenerateAtlasWindow, GenerateAtlasReturnType
 from atlas_texture_creator_gui.components.Window import ProgressDialog
@@ -33,19 +35,40 @@ class AddTexturesToCollectionWorker(QRunnable):
         self.progress_dialog = progress_dialog
 
     def run(self):
-        for old_file_path in self.file_paths:
-            file_path = self.cache_collection.add_texture(old_file_path)
-            atlas_texture_model = AtlasTextureModel(
-                label=file_path.stem,
-                path=Path(file_path),
-            )
-            atlas_texture = self.collection.add_texture(atlas_texture_model)
-            self.atlas_textures.append(atlas_texture)
-            self.atlas_manager.add_texture(self.cache_collection.collection_name, atlas_texture)
-            self.progress_dialog.step()
+        added_textures = []
+
+        with self.cache_collection.blob_store.batch():
+            for old_file_path in self.file_paths:
+                file_path = self.cache_collection.add_texture(old_file_path)
+                atlas_texture_model = AtlasTextureModel(
+                    # the blob is named by its hash, the label keeps the name of the imported file
+                    label=Path(old_file_path).stem,
+                    path=Path(file_path),
+                )
+                atlas_texture = self.collection.add_texture(atlas_texture_model)
+                self.atlas_textures.append(atlas_texture)
+                added_textures.append(atlas_texture)
+                self.progress_dialog.step()
+
+        # one transaction for all textures instead of one commit per file
+        self.atlas_manager.add_textures(self.cache_collection.collection_name, added_textures)
         self.progress_dialog.close_signal.emit()
 
 
+# path separators and what Windows does not allow in file names
+INVALID_FILE_NAME_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+
+def safe_file_name(name: str, fallback: str) -> str:
+    """Turns a texture label into a file name that stays inside the export directory on every platform.
+
+    Falls back to the given name when nothing usable is left of the label.
+    """
+    name = INVALID_FILE_NAME_CHARS.sub("_", name).strip(" .")
+
+    return name or fallback
+
+
 class ExportTexturesWorker(QRunnable):
     def __init__(
         self,
@@ -64,7 +87,9 @@ class ExportTexturesWorker(QRunnable):
             f = Path(texture.img_path)
             column_str = str(texture.column)
             row_str = str(texture.row)
-            new_file_name = f"{column_str},{row_str},{f.name}"
+            # the stored file is named after its content hash, the label is the name the user knows
+            label = safe_file_name(texture.label, f.stem)
+            new_file_name = f"{column_str},{row_str},{label}{f.suffix}"
             new_file_path = os.path.join(self.export_dir, new_file_name)
             shutil.copy(texture.img_path, new_file_path)
             self.progress_dialog.step()
@@ -81,7 +106,8 @@ class AtlasManagerHandler(QObject):
     def __init__(self, app: QApplication, cache_dir: str):
         super().__init__(app)
         self.app = app
-        self.atlas_manager = AtlasManager()
+        # WAL keeps the GUI thread reading while the worker threads write
+        self.atlas_manager = AtlasManager(AtlasManagerConfig(db=AtlasManagerConfigDB(profile="performance")))
         self._current_collection: AtlasCollection | None = None
 
         self._collection_cache_handler = CollectionCacheHandler(cache_dir)
@@ -184,9 +210,9 @@ class AtlasManagerHandler(QObject):
             save_path_obj = Path(save_path)
             texture_coords_path = os.path.join(save_path_dir, f"{save_path_obj.stem}.json")
 
-            img, texture_coords = collection.generate_atlas(options)
+            # only re-composites the changed textures if the atlas was built to this path before
+            _, texture_coords, _ = collection.build_atlas(save_path, options)
 
-            img.save(save_path)
             with open(texture_coords_path, 'w') as f:
                 f.write(texture_coords.json())
 
@@ -306,13 +332,9 @@ class AtlasManagerHandler(QObject):
         old_texture_path = old_texture.path
         new_texture_path = str(new_texture.path)
         if old_texture_path != new_texture_path:
-            number_of_texture_path_in_use = len(list(filter(
-                lambda texture: texture.path == old_texture.path,
-                collection.textures
-            )))
-            old_texture_name = Path(old_texture_path).name
+            number_of_texture_path_in_use = collection.path_refcount(old_texture_path)
             new_texture.path = cache_collection.replace_texture(
-                old_texture_name,
+                str(old_texture_path),
                 new_texture_path,
                 number_of_texture_path_in_use=number_of_texture_path_in_use
             )
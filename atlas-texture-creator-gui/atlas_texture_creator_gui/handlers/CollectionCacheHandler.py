@@ -1,10 +1,130 @@
+import json
 import os
 import shutil
+import threading
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator
+
+from atlas_texture_creator.content_hash import hash_file
+
+
+BLOB_DIR_SUFFIX = ".blobs"
+
+
+def blob_dir_of(cache_dir: Path | str) -> Path:
+    """The blob store next to the cache directory, a collection directory inside it can never have its name."""
+    cache_dir = Path(os.path.abspath(cache_dir))
+
+    return cache_dir.with_name(f"{cache_dir.name}{BLOB_DIR_SUFFIX}")
+
+
+class BlobStore:
+    """Texture files stored once by content hash, shared by every collection.
+
+    refcounts.json counts how many textures of each collection use a blob.
+    A blob that no texture uses anymore gets deleted.
+    """
+    def __init__(self, blob_dir: Path | str):
+        self.blob_dir = Path(blob_dir)
+        self._refcounts_path = self.blob_dir / "refcounts.json"
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self._refcounts: dict[str, dict[str, int]] = self._load_refcounts()
+
+    def add(self, file_path: Path | str, collection_name: str) -> Path:
+        """Copies the file into the store unless its content is already there, and returns the blob path."""
+        file_path = Path(file_path)
+        content_hash = hash_file(file_path)
+        blob_path = self.blob_dir / content_hash[:2] / f"{content_hash}{file_path.suffix.lower()}"
+
+        with self._lock:
+            if not blob_path.exists():
+                blob_path.parent.mkdir(exist_ok=True)
+                tmp_blob_path = blob_path.with_name(f".{blob_path.name}.tmp")
+                shutil.copyfile(file_path, tmp_blob_path)
+                os.replace(tmp_blob_path, blob_path)
+
+            collection_refcounts = self._refcounts.setdefault(blob_path.name, {})
+            collection_refcounts[collection_name] = collection_refcounts.get(collection_name, 0) + 1
+            self._save_refcounts()
+
+        return blob_path
+
+    def release(self, blob_path: Path | str, collection_name: str):
+        blob_path = Path(blob_path)
+
+        with self._lock:
+            collection_refcounts = self._refcounts.get(blob_path.name, {})
+            refcount = collection_refcounts.get(collection_name, 0) - 1
+
+            if refcount > 0:
+                collection_refcounts[collection_name] = refcount
+            else:
+                collection_refcounts.pop(collection_name, None)
+
+            self._delete_unused(blob_path.name)
+            self._save_refcounts()
+
+    def release_collection(self, collection_name: str):
+        with self._lock:
+            for blob_name in list(self._refcounts):
+                if self._refcounts[blob_name].pop(collection_name, None) is not None:
+                    self._delete_unused(blob_name)
+
+            self._save_refcounts()
+
+    def refcount(self, blob_path: Path | str) -> int:
+        with self._lock:
+            return sum(self._refcounts.get(Path(blob_path).name, {}).values())
+
+    def contains(self, file_path: Path | str) -> bool:
+        return Path(os.path.abspath(file_path)).is_relative_to(os.path.abspath(self.blob_dir))
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Writes refcounts.json once at the end instead of after every change."""
+        with self._lock:
+            self._batch_depth += 1
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                self._save_refcounts()
+
+    def _delete_unused(self, blob_name: str):
+        if not self._refcounts.get(blob_name):
+            self._refcounts.pop(blob_name, None)
+            (self.blob_dir / blob_name[:2] / blob_name).unlink(missing_ok=True)
+
+    def _load_refcounts(self) -> dict[str, dict[str, int]]:
+        try:
+            with open(self._refcounts_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_refcounts(self):
+        if self._batch_depth > 0:
+            return
+
+        tmp_refcounts_path = self._refcounts_path.with_name(f".{self._refcounts_path.name}.tmp")
+        with open(tmp_refcounts_path, "w") as f:
+            json.dump(self._refcounts, f)
+        os.replace(tmp_refcounts_path, self._refcounts_path)
 
 
 class CollectionCache(Path):
-    def __init__(self, cache_path_with_collection_name: Path | str):
+    """The texture files of one collection.
+
+    New textures go into the shared BlobStore. Files which older versions copied into the collection directory
+    are still used and removed like before.
+    """
+    def __init__(self, cache_path_with_collection_name: Path | str, blob_store: BlobStore = None):
         if isinstance(cache_path_with_collection_name, str):
             cache_path_with_collection_name = Path(cache_path_with_collection_name)
 
@@ -15,31 +135,31 @@ class CollectionCache(Path):
 
         self.cache_dir = cache_path
         self.collection_name = collection_name
-
-        self.mkdir(parents=True, exist_ok=True)
+        self.blob_store = blob_store if blob_store is not None else BlobStore(blob_dir_of(cache_path))
 
     def add_texture(self, texture_file_path: str) -> Path:
-        file_name = Path(texture_file_path).name
-        file_path = Path(self) / file_name
-        try:
-            shutil.copy(texture_file_path, file_path)
-        except shutil.SameFileError:
-            pass
+        return self.blob_store.add(texture_file_path, self.collection_name)
+
+    def replace_texture(self, texture_path: str, new_texture_path: str, number_of_texture_path_in_use: int = 1) -> str:
+        """number_of_texture_path_in_use is only needed for the files of older versions, blobs count themselves."""
+        file_path = Path(texture_path)
 
-        return file_path
+        if self._same_file(file_path, Path(new_texture_path)):
+            return str(new_texture_path)
 
-    def replace_texture(self, texture_name: str, new_texture_path: str, number_of_texture_path_in_use: int = 1) -> str:
-        file_path = Path(self) / texture_name
+        # added before the old one is released, so replacing a blob with the same content never deletes it
+        new_texture_path = self.add_texture(new_texture_path)
 
-        if not self._same_file(file_path, Path(new_texture_path)):
-            if number_of_texture_path_in_use <= 1:
-                os.remove(file_path)
-            new_texture_path = self.add_texture(new_texture_path)
+        if self.blob_store.contains(file_path):
+            self.blob_store.release(file_path, self.collection_name)
+        elif number_of_texture_path_in_use <= 1:
+            file_path.unlink(missing_ok=True)
 
         return str(new_texture_path)
 
     def delete(self):
-        shutil.rmtree(self)
+        self.blob_store.release_collection(self.collection_name)
+        shutil.rmtree(self, ignore_errors=True)
 
     @staticmethod
     def _same_file(src: Path, dst: Path):
@@ -64,6 +184,7 @@ class CollectionCache(Path):
 class CollectionCacheHandler:
     def __init__(self, cache_dir: str):
         self.cache_dir = Path(cache_dir)
+        self.blob_store = BlobStore(blob_dir_of(self.cache_dir))
 
     def __call__(self, collection_name: str) -> CollectionCache:
-        return CollectionCache(self.cache_dir / collection_name)
+        return CollectionCache(self.cache_dir / collection_name, blob_store=self.blob_store)
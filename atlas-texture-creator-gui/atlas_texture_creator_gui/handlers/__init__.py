@@ -1,2 +1,2 @@
 from atlas_texture_creator_gui.handlers.AtlasManagerHandler import AtlasManagerHandler
-from atlas_texture_creator_gui.handlers.CollectionCacheHandler import CollectionCacheHandler, CollectionCache
+from atlas_texture_creator_gui.handlers.CollectionCacheHandler import CollectionCacheHandler, CollectionCache, BlobStore
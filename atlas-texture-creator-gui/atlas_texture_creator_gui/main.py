@@ -6,6 +6,7 @@ from PySide6.QtCore import Qt, QThreadPool
 from PySide6.QtGui import QPixmap
 from PySide6.QtWidgets import QApplication
 
+from atlas_texture_creator import set_path_validation
 from atlas_texture_creator_gui.handlers import AtlasManagerHandler
 from atlas_texture_creator_gui.Window import MainWindow, AboutWindow
 from atlas_texture_creator_gui.Window.MainWindow import MainWindowMenubar
@@ -17,6 +18,8 @@ class AtlasTextureCreatorGUI(QApplication):
     def __init__(self):
         super().__init__()
         cache_dir = ".data"
+        # a missing texture file shows up when it is opened, not as a stat per texture on every copy
+        set_path_validation("lazy")
         self.thread_pool = QThreadPool()
         self.resources_path = self._get_resources_path()
         self.icon_path = self.resources_path / "images" / "atlas_texture_creator_icon.png"
@@ -0,0 +1,21 @@
+import pytest
+
+from atlas_texture_creator_gui.handlers.AtlasManagerHandler import safe_file_name
+
+
+@pytest.mark.parametrize("label, file_name", [
+    ("grass", "grass"),
+    ("grass 2.old", "grass 2.old"),
+    ("../../grass", "_.._grass"),
+    ("tiles\\grass", "tiles_grass"),
+    ('a<b>c:d"e|f?g*h', "a_b_c_d_e_f_g_h"),
+    ("new\nline", "new_line"),
+    ("grass. ", "grass"),
+])
+def test_safe_file_name(label: str, file_name: str):
+    assert safe_file_name(label, "blob") == file_name
+
+
+@pytest.mark.parametrize("label", ["", "..", " . "])
+def test_safe_file_name_falls_back(label: str):
+    assert safe_file_name(label, "blob") == "blob"
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import pytest
+
+from atlas_texture_creator_gui.handlers.CollectionCacheHandler import BlobStore, CollectionCacheHandler
+
+
+def write_file(file_path: Path, content: bytes) -> Path:
+    file_path.write_bytes(content)
+
+    return file_path
+
+
+def test_blob_store_stores_same_content_once(tmp_path: Path):
+    blob_store = BlobStore(tmp_path / "blobs")
+    file_path = write_file(tmp_path / "a.png", b"a")
+
+    blob_path = blob_store.add(file_path, "collection")
+
+    assert blob_store.add(write_file(tmp_path / "b.PNG", b"a"), "other collection") == blob_path
+    assert blob_path.read_bytes() == b"a"
+    assert blob_path.suffix == ".png"
+    assert blob_store.contains(blob_path)
+    assert not blob_store.contains(file_path)
+    assert blob_store.refcount(blob_path) == 2
+
+
+def test_blob_store_deletes_unused_blobs(tmp_path: Path):
+    blob_store = BlobStore(tmp_path / "blobs")
+    blob_path = blob_store.add(write_file(tmp_path / "a.png", b"a"), "collection")
+    blob_store.add(blob_path, "collection")
+    other_blob_path = blob_store.add(write_file(tmp_path / "b.png", b"b"), "collection")
+    blob_store.add(other_blob_path, "other collection")
+
+    blob_store.release(blob_path, "collection")
+    assert blob_path.is_file()
+
+    blob_store.release(blob_path, "collection")
+    assert not blob_path.exists()
+
+    blob_store.release_collection("collection")
+    assert other_blob_path.is_file()
+    assert blob_store.refcount(other_blob_path) == 1
+
+
+def test_blob_store_keeps_refcounts(tmp_path: Path):
+    blob_store = BlobStore(tmp_path / "blobs")
+
+    with blob_store.batch():
+        blob_path = blob_store.add(write_file(tmp_path / "a.png", b"a"), "collection")
+        blob_store.add(blob_path, "collection")
+
+        assert not (tmp_path / "blobs" / "refcounts.json").exists()
+
+    assert BlobStore(tmp_path / "blobs").refcount(blob_path) == 2
+
+
+@pytest.mark.parametrize("collection_name", [".blobs", "cache.blobs"])
+def test_deleting_a_collection_keeps_the_blob_store(tmp_path: Path, collection_name: str):
+    collection_cache_handler = CollectionCacheHandler(str(tmp_path / "cache"))
+    blob_path = collection_cache_handler("other").add_texture(str(write_file(tmp_path / "a.png", b"a")))
+
+    collection_cache = collection_cache_handler(collection_name)
+    collection_cache.mkdir(parents=True)
+    collection_cache.delete()
+
+    assert blob_path.is_file()
+    assert not collection_cache_handler.blob_store.blob_dir.is_relative_to(tmp_path / "cache")
@@ -1,4 +1,5 @@
 from atlas_texture_creator.atlas_manager import AtlasManager
+from atlas_texture_creator.async_atlas_manager import AsyncAtlasManager
 from atlas_texture_creator.atlas_collection import AtlasCollection, AtlasCollectionModel
-from atlas_texture_creator.atlas_texture import AtlasTexture, AtlasTextureModel
-from atlas_texture_creator.types import AtlasManagerConfig, AtlasManagerConfigDB
+from atlas_texture_creator.atlas_texture import AtlasTexture, AtlasTextureModel, path_validation, set_path_validation
+from atlas_texture_creator.types import AtlasManagerConfig, AtlasManagerConfigDB, AtlasManagerConfigDBPragmas
@@ -0,0 +1,146 @@
+import asyncio
+import contextvars
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Iterable, TypeVar
+
+from PIL import Image
+
+from atlas_texture_creator.atlas_collection import AtlasCollection, GenerateAtlasTextureCoords
+from atlas_texture_creator.atlas_manager import AtlasManager
+from atlas_texture_creator.atlas_texture import AtlasTexture
+from atlas_texture_creator.build_cache import AtlasBuildCache
+from atlas_texture_creator.types import AtlasManagerConfig, GenerateAtlasOptions
+
+
+R = TypeVar("R")
+
+
+class AsyncAtlasManager:
+    """Runs the blocking AtlasManager and AtlasCollection calls in executors, the event loop never waits on them.
+
+    Every write goes through one writer thread, so SQLite never sees two writers at once.
+    Reads run in a pool of reader_workers threads, with the "performance" profile (WAL) they do not wait for
+    the writer. Atlases are generated in a pool of cpu_workers threads, Pillow releases the GIL while it
+    decodes and pastes images.
+    """
+    def __init__(
+        self,
+        config: AtlasManagerConfig = None,
+        atlas_manager: AtlasManager = None,
+        reader_workers: int = 4,
+        cpu_workers: int = None,
+    ):
+        self.atlas_manager = atlas_manager if atlas_manager is not None else AtlasManager(config)
+
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="atlas-db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=reader_workers, thread_name_prefix="atlas-db-reader")
+        self._cpu = ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix="atlas-cpu")
+
+    async def create_collection(self, atlas_collection: AtlasCollection | str) -> AtlasCollection:
+        return await self._run(self._writer, self.atlas_manager.create_collection, atlas_collection)
+
+    async def update_collection(self, collection_name: str, new_collection: AtlasCollection) -> AtlasCollection:
+        return await self._run(self._writer, self.atlas_manager.update_collection, collection_name, new_collection)
+
+    async def delete_collection(self, collection_name: str, vacuum: bool = False):
+        await self._run(self._writer, self.atlas_manager.delete_collection, collection_name, vacuum=vacuum)
+
+    async def list_collections(self) -> list[str]:
+        return await self._run(self._readers, self.atlas_manager.list_collections)
+
+    async def load_collection(self, collection_name: str, validate: bool = False) -> AtlasCollection | None:
+        return await self._run(self._readers, self.atlas_manager.load_collection, collection_name, validate=validate)
+
+    async def load_textures(self, collection_name: str, validate: bool = False) -> list[AtlasTexture]:
+        return await self._run(self._readers, self.atlas_manager.load_textures, collection_name, validate=validate)
+
+    async def load_textures_window(
+        self,
+        collection_name: str,
+        rows: range,
+        columns: range,
+        validate: bool = False,
+    ) -> list[AtlasTexture]:
+        return await self._run(
+            self._readers,
+            self.atlas_manager.load_textures_window,
+            collection_name,
+            rows,
+            columns,
+            validate=validate,
+        )
+
+    async def add_texture(self, collection_name: str, texture: AtlasTexture):
+        await self._run(self._writer, self.atlas_manager.add_texture, collection_name, texture)
+
+    async def add_textures(
+        self,
+        collection_name: str,
+        textures: Iterable[AtlasTexture],
+        chunk_size: int = 1000,
+        on_progress: Callable[[int], None] = None,
+    ) -> int:
+        """Like AtlasManager.add_textures, on_progress is called in the event loop."""
+        if on_progress is not None:
+            on_progress = partial(asyncio.get_running_loop().call_soon_threadsafe, on_progress)
+
+        return await self._run(
+            self._writer,
+            self.atlas_manager.add_textures,
+            collection_name,
+            textures,
+            chunk_size=chunk_size,
+            on_progress=on_progress,
+        )
+
+    async def update_texture(self, collection_name: str, texture: AtlasTexture):
+        await self._run(self._writer, self.atlas_manager.update_texture, collection_name, texture)
+
+    async def update_textures(
+        self,
+        collection_name: str,
+        textures: Iterable[AtlasTexture],
+        chunk_size: int = 1000,
+    ) -> int:
+        return await self._run(
+            self._writer,
+            self.atlas_manager.update_textures,
+            collection_name,
+            textures,
+            chunk_size=chunk_size,
+        )
+
+    async def generate_atlas(
+        self,
+        atlas_collection: AtlasCollection,
+        options: GenerateAtlasOptions = None,
+        cache: AtlasBuildCache = None,
+    ) -> tuple[Image.Image, GenerateAtlasTextureCoords]:
+        return await self._run(self._cpu, atlas_collection.generate_atlas, options, cache=cache)
+
+    async def close(self):
+        """Waits for the running calls, then closes the executors and the database connections."""
+        await asyncio.to_thread(self._shutdown)
+
+    def _shutdown(self):
+        for executor in (self._writer, self._readers, self._cpu):
+            executor.shutdown(wait=True)
+
+        self.atlas_manager.close_all_connections()
+
+    @staticmethod
+    async def _run(executor: Executor, function: Callable[..., R], *args, **kwargs) -> R:
+        # the copied context carries path_validation() into the executor thread
+        context = contextvars.copy_context()
+
+        return await asyncio.get_running_loop().run_in_executor(
+            executor,
+            partial(context.run, function, *args, **kwargs),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
@@ -0,0 +1,82 @@
+from pathlib import Path
+from typing import NamedTuple, TYPE_CHECKING
+
+from pydantic import BaseModel, ValidationError
+
+from atlas_texture_creator.content_hash import ContentHash
+from atlas_texture_creator.types import GenerateAtlasCoordTexture, GenerateAtlasOptions, Column, Row
+
+if TYPE_CHECKING:
+    from atlas_texture_creator.atlas_collection import GenerateAtlasTextureCoords
+
+
+# Options which do not change the output image, only how fast it is made
+ATLAS_BUILD_IGNORED_OPTIONS = {"workers", "backend"}
+
+
+class AtlasBuildTexture(BaseModel):
+    row: Row
+    column: Column
+    label: str
+    path: str
+    content_hash: ContentHash
+    coord: GenerateAtlasCoordTexture
+
+
+class AtlasBuildState(BaseModel):
+    """Layout and texture content hashes of the last build of an atlas, stored next to the atlas image."""
+    options: dict
+    page_sizes: list[tuple[int, int]]
+    textures: list[AtlasBuildTexture]
+
+    @classmethod
+    def load(cls, file_path: Path | str) -> "AtlasBuildState | None":
+        try:
+            return cls.parse_file(file_path)
+        except (OSError, ValueError, ValidationError):
+            return None
+
+    def save(self, file_path: Path | str):
+        with open(file_path, "w") as f:
+            f.write(self.json())
+
+    def layout_matches(self, other: "AtlasBuildState") -> bool:
+        if self.options != other.options or self.page_sizes != other.page_sizes:
+            return False
+        if len(self.textures) != len(other.textures):
+            return False
+
+        for texture, other_texture in zip(self.textures, other.textures):
+            if (
+                texture.row != other_texture.row
+                or texture.column != other_texture.column
+                or texture.label != other_texture.label
+                or texture.coord != other_texture.coord
+            ):
+                return False
+
+        return True
+
+    def changed_textures(self, previous: "AtlasBuildState") -> list[int]:
+        """Indexes of the textures whose content differs from previous, expects a matching layout."""
+        return [
+            i for i, (texture, previous_texture) in enumerate(zip(self.textures, previous.textures))
+            if texture.content_hash != previous_texture.content_hash
+        ]
+
+
+class AtlasBuildResult(NamedTuple):
+    file_paths: list[Path]
+    textures_coord: "GenerateAtlasTextureCoords"
+    # None if every page was composited from scratch
+    patched_labels: list[str] | None
+
+
+def atlas_build_options(options: GenerateAtlasOptions) -> dict:
+    return options.dict(exclude=ATLAS_BUILD_IGNORED_OPTIONS)
+
+
+def atlas_build_state_path(file_path: Path | str) -> Path:
+    file_path = Path(file_path)
+
+    return file_path.with_name(f"{file_path.name}.build.json")
@@ -1,18 +1,70 @@
+import bisect
 import math
-from typing import Iterator
+import os
+from array import array
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Sequence, TYPE_CHECKING
 
 from PIL import Image
 from pydantic import BaseModel, Field, Extra, constr
 
-from atlas_texture_creator.atlas_texture import AtlasTexture, AtlasTextureModel
+from atlas_texture_creator.atlas_build import AtlasBuildResult, AtlasBuildState, AtlasBuildTexture, \
+    atlas_build_options, atlas_build_state_path
+from atlas_texture_creator.atlas_texture import AtlasTexture, AtlasTextureModel, missing_paths
+from atlas_texture_creator.atlas_writer import AtlasStreamFormat, get_stream_writer
+from atlas_texture_creator.build_cache import AtlasBuildCache, atlas_build_key
+from atlas_texture_creator.content_hash import get_content_hash
+from atlas_texture_creator.image_size import get_image_size
+from atlas_texture_creator import numpy_backend
+from atlas_texture_creator.packers import AtlasPackerRect, get_packer, next_power_of_two
+from atlas_texture_creator.utils import imap_ordered
 from atlas_texture_creator.types import GenerateAtlasReturnType, GenerateAtlasCoordTexture, \
-    GenerateAtlasReturnTypeOut, AtlasGridDirection, GenerateAtlasOptions, AtlasGridItem, Column, Row
+    GenerateAtlasReturnTypeOut, AtlasGridDirection, GenerateAtlasOptions, AtlasGridItem, Column, Row, \
+    GenerateAtlasOptionsSize
+
+if TYPE_CHECKING:
+    import numpy as np
 
 
 class AtlasCollectionModel(BaseModel):
     name: constr(min_length=1) = Field(unique=True)
 
 
+def _extrude_image(atlas: Image.Image, img: Image.Image, x: int, y: int, extrude: int):
+    """Repeats the border pixels of img (pasted at x, y) extrude pixels outwards."""
+    width, height = img.size
+    stretch = partial(Image.Image.resize, resample=Image.Resampling.NEAREST)
+
+    atlas.paste(stretch(img.crop((0, 0, width, 1)), (width, extrude)), (x, y - extrude))
+    atlas.paste(stretch(img.crop((0, height - 1, width, height)), (width, extrude)), (x, y + height))
+    atlas.paste(stretch(img.crop((0, 0, 1, height)), (extrude, height)), (x - extrude, y))
+    atlas.paste(stretch(img.crop((width - 1, 0, width, height)), (extrude, height)), (x + width, y))
+
+    corners = (
+        ((0, 0), (x - extrude, y - extrude)),
+        ((width - 1, 0), (x + width, y - extrude)),
+        ((0, height - 1), (x - extrude, y + height)),
+        ((width - 1, height - 1), (x + width, y + height)),
+    )
+    for pixel, (corner_x, corner_y) in corners:
+        atlas.paste(img.getpixel(pixel), (corner_x, corner_y, corner_x + extrude, corner_y + extrude))
+
+
+def atlas_page_file_path(file_path: Path | str, page: int) -> Path:
+    file_path = Path(file_path)
+
+    return file_path.with_name(f"{file_path.stem}_{page}{file_path.suffix}")
+
+
+def atlas_page_file_paths(file_path: Path | str, pages: int) -> list[Path]:
+    """A single page is saved to file_path itself, more pages get numbered."""
+    if pages == 1:
+        return [Path(file_path)]
+
+    return [atlas_page_file_path(file_path, page) for page in range(pages)]
+
+
 class GenerateAtlasTextureCoords:
     def __init__(self, init_data: GenerateAtlasReturnType = None):
         if init_data is None:
@@ -24,7 +76,7 @@ class GenerateAtlasTextureCoords:
         self.data[label] = data
 
     def json(self):
-        return GenerateAtlasReturnTypeOut.parse_obj(self.data).json()
+        return GenerateAtlasReturnTypeOut.parse_obj(self.data).json(exclude_defaults=True)
 
     def __len__(self):
         return len(self.data.keys())
@@ -34,118 +86,345 @@ class GenerateAtlasTextureCoords:
             yield label, atlas_texture_coord
 
 
+class GenerateAtlasLayout:
+    def __init__(self):
+        self.page_sizes: list[tuple[int, int]] = []
+        self.items: list[tuple[AtlasTexture, GenerateAtlasCoordTexture]] = []
+        self.textures_coord = GenerateAtlasTextureCoords()
+
+    def add(self, texture: AtlasTexture, coord: GenerateAtlasCoordTexture):
+        self.items.append((texture, coord))
+        self.textures_coord.add_data(texture.label, coord)
+
+    def page_items(self, page: int) -> list[tuple[AtlasTexture, GenerateAtlasCoordTexture]]:
+        return [(texture, coord) for texture, coord in self.items if coord.page == page]
+
+    @property
+    def size(self) -> tuple[int, int]:
+        if len(self.page_sizes) == 0:
+            return 0, 0
+
+        return self.page_sizes[0]
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        for texture, coord in self.items:
+            yield texture, coord
+
+
+class _InternTable:
+    """Stores every distinct value once and hands out its id."""
+    def __init__(self, key: Callable = None):
+        self._key = key
+        self._values: list = []
+        self._ids: dict = {}
+
+    def intern(self, value) -> int:
+        key = value if self._key is None else self._key(value)
+        value_id = self._ids.get(key)
+
+        if value_id is None:
+            value_id = self._ids[key] = len(self._values)
+            self._values.append(value)
+
+        return value_id
+
+    def get_id(self, value) -> int | None:
+        return self._ids.get(value if self._key is None else self._key(value))
+
+    def __getitem__(self, value_id: int):
+        return self._values[value_id]
+
+    def __len__(self):
+        return len(self._values)
+
+
+class _TextureIndex:
+    """The texture indexes of every value id, in insertion order.
+
+    A value with one texture costs one slot in an array, only values with more textures get an array of their own.
+    """
+    def __init__(self):
+        # the only texture of a value, -1 for none or more than one
+        self._first = array("i")
+        self._more: dict[int, array] = {}
+
+    def add(self, value_id: int, index: int):
+        if value_id == len(self._first):
+            self._first.append(index)
+            return
+
+        value_textures = self._more.get(value_id)
+
+        if value_textures is None:
+            first = self._first[value_id]
+            value_textures = self._more[value_id] = array("i") if first == -1 else array("i", [first])
+            self._first[value_id] = -1
+
+        if len(value_textures) == 0 or value_textures[-1] < index:
+            value_textures.append(index)
+        else:
+            value_textures.insert(bisect.bisect(value_textures, index), index)
+
+    def extend(self, value_ids: Iterable[int], start: int):
+        """add() for the texture indexes start, start + 1, ..., one per value id."""
+        first = self._first
+
+        for index, value_id in enumerate(value_ids, start):
+            if value_id == len(first):
+                first.append(index)
+            else:
+                self.add(value_id, index)
+
+    def remove(self, value_id: int, index: int):
+        if value_id in self._more:
+            self._more[value_id].remove(index)
+        else:
+            self._first[value_id] = -1
+
+    def __getitem__(self, value_id: int) -> Sequence[int]:
+        value_textures = self._more.get(value_id)
+
+        if value_textures is not None:
+            return value_textures
+
+        first = self._first[value_id]
+
+        return () if first == -1 else (first,)
+
+
 class AtlasCollectionTextureStore:
+    """Keeps the textures in parallel arrays, one entry per texture, with paths and labels interned.
+
+    get(), row(), column() and iteration return new AtlasTexture views of the stored values,
+    changing a view does not change the store, replace() does.
+    The textures of every path and label are indexed, so looking them up does not walk the store.
+    A texture with its own label costs about 110 bytes next to its label string, most of it for interning the label.
+    """
     def __init__(self, grid_direction: AtlasGridDirection = "row"):
-        self._textures: list[list[AtlasTexture]] = []
         self.grid = AtlasGrid(direction=grid_direction)
 
-        # 1 = self._textures[0][0] = [[1]]  # new array
-        # 2 = self._textures[0][1] = [[1, 2]]
-        # 3 = self._textures[1][0] = [[1, 2], [3]]  # new array
-        # 4 = self._textures[1][1] = [[1, 2], [3, 4]]
-        # 5 = self._textures[0][2] = [[1, 2, 5], [3, 4]]
-        # 6 = self._textures[2][0] = [[1, 2, 5], [3, 4], [6]]  # new array
-        # 7 = self._textures[1][2] = [[1, 2, 5], [3, 4, 7], [6]]
-        # 8 = self._textures[2][1] = [[1, 2, 5], [3, 4, 7], [6, 8]]
-        # 9 = self._textures[2][2] = [[1, 2, 5], [3, 4, 7], [6, 8, 9]]
-        # 10 = self._textures[0][3] = [[1, 2, 5, 10], [3, 4, 7], [6, 8, 9]]
-        # 11 = self._textures[3][0] = [[1, 2, 5, 10], [3, 4, 7], [6, 8, 9], [11]]  # new array
-        # 12 = self._textures[1][3] = [[1, 2, 5, 10], [3, 4, 7, 12], [6, 8, 9], [11]]
-        # 13 = self._textures[3][1] = [[1, 2, 5, 10], [3, 4, 7, 12], [6, 8, 9], [11, 13]]
-        # 14 = self._textures[2][3] = [[1, 2, 5, 10], [3, 4, 7, 12], [6, 8, 9, 14], [11, 13]]
-        # 15 = self._textures[3][2] = [[1, 2, 5, 10], [3, 4, 7, 12], [6, 8, 9, 14], [11, 13, 15]]
-        # 16 = self._textures[3][3] = [[1, 2, 5, 10], [3, 4, 7, 12], [6, 8, 9, 14], [11, 13, 15, 16]]
-        # 17 = self._textures[0][4] = [[1, 2, 5, 10, 17], [3, 4, 7, 12], [6, 8, 9, 14], [11, 13, 15, 16]]
-        # 18 = self._textures[4][0] = [[1, 2, 5, 10, 17], [3, 4, 7, 12], [6, 8, 9, 14], [11, 13, 15, 16], [18]]  # new array
-        # self._textures[self.row_counter][self.column_counter]
-        # arrays = row; numbers in array = column
-        # column = 0 = new array
+        self._rows = array("i")
+        self._columns = array("i")
+        self._path_ids = array("i")
+        self._label_ids = array("i")
+        self._paths = _InternTable(key=os.fspath)
+        self._labels = _InternTable()
+        # texture indexes in insertion order by path id and by label id
+        self._path_textures = _TextureIndex()
+        self._label_textures = _TextureIndex()
+
+        # self._grid[column][row] is the index of the texture in the arrays above
+        # 1 = self._grid[0][0] = [[1]]  # new array
+        # 2 = self._grid[0][1] = [[1, 2]]
+        # 3 = self._grid[1][0] = [[1, 2], [3]]  # new array
+        # 4 = self._grid[1][1] = [[1, 2], [3, 4]]
+        # 5 = self._grid[0][2] = [[1, 2, 5], [3, 4]]
+        # 6 = self._grid[2][0] = [[1, 2, 5], [3, 4], [6]]  # new array
+        # 7 = self._grid[1][2] = [[1, 2, 5], [3, 4, 7], [6]]
+        # 8 = self._grid[2][1] = [[1, 2, 5], [3, 4, 7], [6, 8]]
+        # 9 = self._grid[2][2] = [[1, 2, 5], [3, 4, 7], [6, 8, 9]]
+        # 10 = self._grid[0][3] = [[1, 2, 5, 10], [3, 4, 7], [6, 8, 9]]
+        # column = new array
+        self._grid: list[array] = []
 
     def add(self, texture: AtlasTexture) -> AtlasGridItem:
-        grid_item = self.grid.add()
+        index = len(self.grid)
+        row, column = self.grid.coord_of(index)
+
+        # the grid only moves on once the texture is stored
+        self._store_texture(texture.path, texture.label, row=row, column=column)
+        self.grid.set_length(index + 1)
+        texture.set_coord(column=column, row=row)
 
-        texture.set_coord(column=grid_item.column, row=grid_item.row)
-        self._store_texture(texture, column=grid_item.column, row=grid_item.row)
+        return AtlasGridItem(column=column, row=row)
 
-        return grid_item
+    def load(self, textures: list[AtlasTexture]):
+        """Stores textures at the row and column they already have, without running the grid for each one.
+
+        The textures have to come in the order they were added, at the coords add() gave them, or a ValueError
+        is raised before anything is stored.
+        """
+        self._check_grid_coords((texture.row, texture.column) for texture in textures)
+
+        for texture in textures:
+            self._store_texture(texture.path, texture.label, row=texture.row, column=texture.column)
+
+        self.grid.set_length(len(self.grid) + len(textures))
+
+    def load_rows(self, rows: list[tuple[str, str, Row, Column]]):
+        """Like load(), for plain (path, label, row, column) rows as they come from the database.
+
+        No AtlasTexture is built and every distinct path string becomes a Path only once.
+        """
+        if len(rows) == 0:
+            return
+
+        paths, labels, texture_rows, texture_columns = zip(*rows)
+        start = len(self._rows)
+        self._check_grid_coords(zip(texture_rows, texture_columns))
+
+        for index, row, column in zip(range(start, start + len(rows)), texture_rows, texture_columns):
+            self._place(index, row, column)
+
+        distinct_path_ids = {path: self._paths.intern(Path(path)) for path in dict.fromkeys(paths)}
+        path_ids = [distinct_path_ids[path] for path in paths]
+        label_ids = list(map(self._labels.intern, labels))
+
+        self._rows.extend(texture_rows)
+        self._columns.extend(texture_columns)
+        self._path_ids.extend(path_ids)
+        self._label_ids.extend(label_ids)
+        self._path_textures.extend(path_ids, start)
+        self._label_textures.extend(label_ids, start)
+
+        self.grid.set_length(len(self.grid) + len(rows))
+
+    def extend(self, textures: list[AtlasTexture]):
+        """Adds the textures like add() does for each one, the coords come from the grid index directly."""
+        start = len(self.grid)
+
+        for index, texture in enumerate(textures, start):
+            row, column = self.grid.coord_of(index)
+
+            texture.set_coord(column=column, row=row)
+            self._store_texture(texture.path, texture.label, row=row, column=column)
+
+        self.grid.set_length(start + len(textures))
 
     def replace(self, texture_model: AtlasTextureModel, row: Row, column: Column):
-        atlas_texture = self._textures[column][row]
+        index = self._grid[column][row]
+
+        atlas_texture = self._texture(index)
         atlas_texture.update(texture_model)
 
-    def _store_texture(self, texture: AtlasTexture, row: Row, column: Column):
-        texture.set_coord(column=column, row=row)
+        self._path_textures.remove(self._path_ids[index], index)
+        self._label_textures.remove(self._label_ids[index], index)
+        self._path_ids[index] = self._index_texture(self._paths, self._path_textures, atlas_texture.path, index)
+        self._label_ids[index] = self._index_texture(self._labels, self._label_textures, atlas_texture.label, index)
+
+    def find_by_path(self, path: Path | str) -> list[AtlasTexture]:
+        return [self._texture(index) for index in self._textures_of(self._paths, self._path_textures, path)]
+
+    def find_by_label(self, label: str) -> list[AtlasTexture]:
+        return [self._texture(index) for index in self._textures_of(self._labels, self._label_textures, label)]
+
+    def path_refcount(self, path: Path | str) -> int:
+        return len(self._textures_of(self._paths, self._path_textures, path))
+
+    @staticmethod
+    def _index_texture(table: _InternTable, textures: _TextureIndex, value, index: int) -> int:
+        value_id = table.intern(value)
+        textures.add(value_id, index)
+
+        return value_id
+
+    @staticmethod
+    def _textures_of(table: _InternTable, textures: _TextureIndex, value) -> Sequence[int]:
+        value_id = table.get_id(value)
+
+        return () if value_id is None else textures[value_id]
+
+    def _store_texture(self, path: Path, label: str, row: Row, column: Column):
+        self._store_ids(self._paths.intern(path), self._labels.intern(label), row, column)
 
-        if len(self._textures) == column:
-            self._textures.append([])
+    def _store_ids(self, path_id: int, label_id: int, row: Row, column: Column):
+        index = len(self._rows)
 
-        self._textures[column].append(texture)
+        self._place(index, row, column)
+        self._rows.append(row)
+        self._columns.append(column)
+        self._path_ids.append(path_id)
+        self._label_ids.append(label_id)
+        self._path_textures.add(path_id, index)
+        self._label_textures.add(label_id, index)
+
+    def _check_grid_coords(self, coords: Iterable[tuple[Row, Column]]):
+        """Raises a ValueError unless coords are the next coords of the grid, in order."""
+        coord_of = self.grid.coord_of
+
+        for index, coord in enumerate(coords, len(self.grid)):
+            if coord_of(index) != coord:
+                raise ValueError(f"texture {index} is stored at (row, column) {coord} instead of {coord_of(index)}")
+
+    def _place(self, index: int, row: Row, column: Column):
+        while len(self._grid) <= column:
+            self._grid.append(array("i"))
+
+        column_indexes = self._grid[column]
+        if len(column_indexes) != row:
+            raise ValueError(f"no texture at row {len(column_indexes)} of column {column}")
+
+        column_indexes.append(index)
+
+    def _texture(self, index: int) -> AtlasTexture:
+        return AtlasTexture.unchecked(
+            path=self._paths[self._path_ids[index]],
+            label=self._labels[self._label_ids[index]],
+            column=self._columns[index],
+            row=self._rows[index],
+        )
 
     def get(self, row: Row, column: Column):
-        return self._textures[column][row]
+        return self._texture(self._grid[column][row])
 
     def column(self, column: Column):
-        return self._textures[column]
+        return [self._texture(index) for index in self._grid[column]]
 
     def row(self, row: Row):
-        row_list = []
+        """The textures of row, from left to right. Columns without a texture in row are left out."""
+        textures = [self._texture(column[row]) for column in self._grid if row < len(column)]
+
+        if not textures:
+            raise IndexError(f"no texture in row {row}")
 
-        for column in self._textures:
-            texture = column[row]
-            row_list.append(texture)
+        return textures
 
-        return row_list
+    def has(self, row: Row, column: Column) -> bool:
+        return 0 <= column < len(self._grid) and 0 <= row < len(self._grid[column])
+
+    def occupancy(self) -> list[int]:
+        """The number of textures in every column.
+
+        A column is filled from row 0 without gaps, so (row, column) holds a texture if row < occupancy[column].
+        """
+        return [len(column) for column in self._grid]
+
+    def iter_columns(self) -> Iterator[AtlasTexture]:
+        """Column-major: column 0 from top to bottom, then column 1, ..."""
+        for column in self._grid:
+            for index in column:
+                yield self._texture(index)
+
+    def iter_rows(self) -> Iterator[AtlasTexture]:
+        """Row-major: row 0 from left to right, then row 1, ..."""
+        occupancy = self.occupancy()
+
+        for row in range(max(occupancy, default=0)):
+            for column, column_length in enumerate(occupancy):
+                if row < column_length:
+                    yield self._texture(self._grid[column][row])
 
     def __iter__(self):
-        # COLUMNS
-        for column in self._textures:
-            for item in column:
-                yield item
-
-        # ROWS: # TODO: NOT WORKING
-        # counter = 0
-        # all_items_yield = False
-        # while not all_items_yield:
-        #     for row in self._textures:
-        #         try:
-        #             yield row[counter]
-        #         except IndexError:
-        #             all_items_yield = True
-        #             break
-        #     counter += 1
-
-        # square_number = math.ceil(math.sqrt(self._store_length))
-        #
-        # for column in range(square_number):
-        #     for row in range(square_number):
-        #         try:
-        #             yield self.get(row=row, column=column)
-        #         except IndexError:
-        #             break
+        return self.iter_columns()
 
     def __getitem__(self, item):
-        return self._textures[item]
+        return self.column(item)
 
     def __len__(self):
-        return len(self.grid)
-
-    def _coord_flip(self):
-        self._add_to_column = 0 if self._add_to_column == 1 else 1
-
-    def _reset_add_to_column(self):
-        self._add_to_column = 0
+        return len(self._rows)
 
     def __eq__(self, other: "AtlasCollectionTextureStore"):
         if len(self) != len(other):
             return False
 
         for texture in self:
-            try:
-                other_texture = other.get(texture.row, texture.column)
-            except IndexError:
+            if not other.has(texture.row, texture.column):
                 return False
 
-            if texture != other_texture:
+            if texture != other.get(texture.row, texture.column):
                 return False
 
         return True
@@ -160,49 +439,84 @@ class AtlasGrid:
         self.offset = 0
 
     def add(self) -> AtlasGridItem:
-        if self._calc_square():
-            row = column = self.squares
+        index = len(self)
+        row, column = self.coord_of(index)
+
+        self.set_length(index + 1)
 
-            self._set_next_square()
+        return AtlasGridItem(column=column, row=row)
+
+    def coord_of(self, index: int) -> tuple[Row, Column]:
+        """The (row, column) of the index-th added item.
+
+        The items fill one square after the other. The items of square s (the ones from s*s on) alternate
+        between row s and column s, towards the corner (s, s):
+        row direction: (s, 0), (0, s), (s, 1), (1, s), ..., (s, s)
+        """
+        square = math.isqrt(index)
+        steps = index - square * square
+        offset = steps // 2
+
+        if steps % 2 == 0:
+            coord = square, offset
         else:
-            row = column = self.offset
-
-            if self.direction == "row":
-                if self.column == self.row:
-                    self.row += 1
-                    row = self.squares
-                elif self.column < self.row:
-                    self.column += 1
-                    column = self.squares
-                    self.offset += 1
-            elif self.direction == "column":
-                if self.column == self.row:
-                    self.column += 1
-                    column = self.squares
-                elif self.row < self.column:
-                    self.row += 1
-                    row = self.squares
-                    self.offset += 1
-
-        item = AtlasGridItem(
-            column=column,
-            row=row,
-        )
+            coord = offset, square
 
-        return item
+        return coord if self.direction == "row" else coord[::-1]
 
-    def _calc_square(self) -> bool:
-        length = len(self) + 1
-        l_sqrt = math.sqrt(length)
-        is_integer = l_sqrt.is_integer()
+    def index_of(self, row: Row, column: Column) -> int:
+        """The inverse of coord_of()."""
+        if self.direction == "column":
+            row, column = column, row
 
-        return is_integer
+        square = max(row, column)
 
-    def _set_next_square(self):
-        self.squares += 1
-        self.offset = 0
-        self.row = 0
-        self.column = 0
+        if row == square:
+            return square * square + 2 * column
+
+        return square * square + 2 * row + 1
+
+    def allocate(self, n: int) -> "np.ndarray":
+        """Adds n items at once and returns their coordinates as int64[n, 2] array of (row, column)."""
+        # numpy is optional, only allocate() needs it
+        numpy_backend.require_numpy()
+        import numpy as np
+
+        start = len(self)
+        index = np.arange(start, start + n, dtype=np.int64)
+        square = np.sqrt(index).astype(np.int64)
+        # the float root can be one off for big indexes
+        square -= square * square > index
+        square += (square + 1) * (square + 1) <= index
+
+        # the closed form of coord_of()
+        steps = index - square * square
+        offset = steps // 2
+        odd = (steps % 2).astype(bool)
+
+        coords = np.empty((n, 2), dtype=np.int64)
+        coords[:, 0] = np.where(odd, offset, square)
+        coords[:, 1] = np.where(odd, square, offset)
+
+        if self.direction == "column":
+            coords = np.ascontiguousarray(coords[:, ::-1])
+
+        self.set_length(start + n)
+
+        return coords
+
+    def set_length(self, length: int):
+        """Moves the grid to the state it has after length calls of add()."""
+        self.squares = math.isqrt(length)
+        steps = length - self.squares * self.squares
+        self.offset = steps // 2
+
+        if self.direction == "row":
+            self.row = steps - self.offset
+            self.column = self.offset
+        else:
+            self.column = steps - self.offset
+            self.row = self.offset
 
     def __len__(self):
         length = (self.squares * self.squares) + self.row + self.column
@@ -230,9 +544,16 @@ class AtlasCollection(AtlasCollectionModel, extra=Extra.allow):
     def load_texture(self, texture: AtlasTexture):
         self.texture_store.add(texture)
 
-    def load_textures(self, textures: list[AtlasTexture]):
-        for texture in textures:
-            self.load_texture(texture)
+    def load_textures(self, textures: list[AtlasTexture], keep_coords: bool = False):
+        """Adds the textures in order, keep_coords stores them at the row and column they already have."""
+        if keep_coords:
+            self.texture_store.load(textures)
+        else:
+            self.texture_store.extend(textures)
+
+    def load_texture_rows(self, rows: list[tuple[str, str, Row, Column]]):
+        """Adds plain (path, label, row, column) rows in order, at the row and column they have."""
+        self.texture_store.load_rows(rows)
 
     def get_texture(self, row: Row, column: Column) -> AtlasTexture:
         return self.texture_store.get(row=row, column=column)
@@ -244,74 +565,404 @@ class AtlasCollection(AtlasCollectionModel, extra=Extra.allow):
     def update_texture(self, row: Row, column: Column, new_texture_model: AtlasTextureModel):
         self.texture_store.replace(new_texture_model, row=row, column=column)
 
-    def generate_atlas(self, options: GenerateAtlasOptions = None) -> tuple[Image.Image, GenerateAtlasTextureCoords]:
-        textures_coord = GenerateAtlasTextureCoords()
-        atlas_width = 0
-        atlas_height = 0
-        square_number = math.ceil(math.sqrt(len(self.texture_store)))
-        lock_texture_width = None
-        lock_texture_height = None
-
-        if options is not None and options.lock_size:
-            lock_texture_width = options.lock_size.width
-            lock_texture_height = options.lock_size.height
-
-        atlas = Image.new(mode="RGBA", size=(0, 0))
-
-        for row in range(square_number):
-            column_width = 0
-            column_height = 0
-            column_imgs = []
-
-            for column in range(square_number):
-                try:
-                    texture = self.texture_store.get(row=row, column=column)
-                except IndexError:
-                    continue
-                img = Image.open(texture.img_path)
-
-                if lock_texture_width is not None or lock_texture_height is not None:
-                    new_img_width = lock_texture_width or img.width
-                    new_img_height = lock_texture_height or img.height
-                    img = img.resize((new_img_width, new_img_height))
-
-                img_width, img_height = img.size
-
-                if img_width > column_width:
-                    column_width = img_width
-                column_height += img_height
-
-                column_imgs.append({
-                    "label": texture.label,
-                    "img": img,
-                })
-
-            offset_x = atlas_width
-            offset_y = 0
-
-            atlas_width += column_width
-            if column_height > atlas_height:
-                atlas_height = column_height
-
-            new_atlas = Image.new("RGBA", size=(atlas_width, atlas_height))
-            new_atlas.paste(atlas)
-            atlas = new_atlas
-
-            for img_obj in column_imgs:
-                label = img_obj["label"]
-                img = img_obj["img"]
-
-                textures_coord.add_data(label, GenerateAtlasCoordTexture(
-                    x=offset_x,
-                    y=offset_y,
-                    width=img.width,
-                    height=img.height,
-                ))
-
-                atlas.paste(img, (offset_x, offset_y))
-                offset_y += img.height
-
-        return atlas, textures_coord
+    def find_by_label(self, label: str) -> AtlasTexture | None:
+        """The first added texture with label, or None."""
+        textures = self.texture_store.find_by_label(label)
+
+        return textures[0] if textures else None
+
+    def find_by_path(self, path: Path | str) -> list[AtlasTexture]:
+        """Every texture using the file at path, in the order they were added."""
+        return self.texture_store.find_by_path(path)
+
+    def path_refcount(self, path: Path | str) -> int:
+        """How many textures use the file at path."""
+        return self.texture_store.path_refcount(path)
+
+    def validate_paths(self, workers: int = 16) -> list[AtlasTexture]:
+        """Returns the textures whose file does not exist, the paths are checked in parallel."""
+        missing = missing_paths((texture.img_path for texture in self), workers=workers)
+
+        return [texture for texture in self if os.fspath(texture.img_path) in missing]
+
+    def generate_atlas(
+        self,
+        options: GenerateAtlasOptions = None,
+        cache: AtlasBuildCache = None,
+    ) -> tuple[Image.Image, GenerateAtlasTextureCoords]:
+        if options is None:
+            options = GenerateAtlasOptions()
+
+        if cache is not None:
+            build_key = self.atlas_build_key(options)
+            cached = cache.get(build_key)
+
+            if cached is not None:
+                atlas, textures_coord = cached
+
+                return atlas, GenerateAtlasTextureCoords(textures_coord)
+
+            atlas, textures_coord = self.generate_atlas(options)
+            if len(textures_coord) > 0:
+                cache.put(build_key, atlas, textures_coord)
+
+            return atlas, textures_coord
+
+        layout = self.generate_atlas_layout(options)
+
+        if len(layout.page_sizes) > 1:
+            raise ValueError(
+                f"The atlas needs {len(layout.page_sizes)} pages of max_size, "
+                f"use generate_atlas_pages or save_atlas_pages instead"
+            )
+
+        atlas = next(self._composite_atlas_pages(layout, options), None)
+        if atlas is None:
+            atlas = Image.new(mode="RGBA", size=(0, 0))
+
+        return atlas, layout.textures_coord
+
+    def generate_atlas_pages(
+        self,
+        options: GenerateAtlasOptions = None,
+    ) -> tuple[list[Image.Image], GenerateAtlasTextureCoords]:
+        if options is None:
+            options = GenerateAtlasOptions()
+
+        layout = self.generate_atlas_layout(options)
+        atlas_pages = list(self._composite_atlas_pages(layout, options))
+
+        return atlas_pages, layout.textures_coord
+
+    def save_atlas_pages(
+        self,
+        file_path: Path | str,
+        options: GenerateAtlasOptions = None,
+    ) -> tuple[list[Path], GenerateAtlasTextureCoords]:
+        """Saves every page as soon as it is composited, so only one page is held in memory at a time."""
+        if options is None:
+            options = GenerateAtlasOptions()
+
+        layout = self.generate_atlas_layout(options)
+        page_file_paths = atlas_page_file_paths(file_path, len(layout.page_sizes))
+        self._save_atlas_pages(layout, options, page_file_paths)
+
+        return page_file_paths, layout.textures_coord
+
+    def save_atlas_streaming(
+        self,
+        file_path: Path | str,
+        options: GenerateAtlasOptions = None,
+        image_format: AtlasStreamFormat = "png",
+        band_height: int = 256,
+    ) -> tuple[list[Path], GenerateAtlasTextureCoords]:
+        """Like save_atlas_pages, but composites and writes every page in bands of band_height rows.
+
+        Only one band and the textures overlapping it are held in memory, so peak memory
+        does not grow with the atlas size. "raw" writes the plain RGBA bytes row by row.
+        """
+        if options is None:
+            options = GenerateAtlasOptions()
+
+        layout = self.generate_atlas_layout(options)
+        page_file_paths = atlas_page_file_paths(file_path, len(layout.page_sizes))
+
+        for page, (page_file_path, page_size) in enumerate(zip(page_file_paths, layout.page_sizes)):
+            with open(page_file_path, "wb") as f, get_stream_writer(image_format, f, page_size) as writer:
+                for band in self._composite_atlas_bands(layout.page_items(page), page_size, options, band_height):
+                    writer.write_band(band)
+
+        return page_file_paths, layout.textures_coord
+
+    def build_atlas(
+        self,
+        file_path: Path | str,
+        options: GenerateAtlasOptions = None,
+        incremental: bool = True,
+    ) -> AtlasBuildResult:
+        """Saves the atlas like save_atlas_pages and remembers the layout and texture hashes of the build.
+
+        If the layout did not change since the last build, only the rectangles of the
+        textures whose content changed are patched into the existing atlas images.
+        """
+        if options is None:
+            options = GenerateAtlasOptions()
+
+        layout = self.generate_atlas_layout(options)
+        page_file_paths = atlas_page_file_paths(file_path, len(layout.page_sizes))
+        state_file_path = atlas_build_state_path(file_path)
+        state = AtlasBuildState(
+            options=atlas_build_options(options),
+            page_sizes=layout.page_sizes,
+            textures=[
+                AtlasBuildTexture(
+                    row=texture.row,
+                    column=texture.column,
+                    label=texture.label,
+                    path=str(texture.img_path),
+                    content_hash=get_content_hash(texture.img_path),
+                    coord=coord,
+                )
+                for texture, coord in layout
+            ],
+        )
+        previous_state = AtlasBuildState.load(state_file_path) if incremental else None
+
+        if (
+            previous_state is not None
+            and state.layout_matches(previous_state)
+            and all(page_file_path.exists() for page_file_path in page_file_paths)
+        ):
+            changed_items = [layout.items[i] for i in state.changed_textures(previous_state)]
+            self._patch_atlas_pages(changed_items, options, page_file_paths)
+            patched_labels = [texture.label for texture, _ in changed_items]
+        else:
+            self._save_atlas_pages(layout, options, page_file_paths)
+            patched_labels = None
+
+        state.save(state_file_path)
+
+        return AtlasBuildResult(page_file_paths, layout.textures_coord, patched_labels)
+
+    def generate_atlas_layout(self, options: GenerateAtlasOptions = None) -> "GenerateAtlasLayout":
+        if options is None:
+            options = GenerateAtlasOptions()
+
+        layout = GenerateAtlasLayout()
+        textures = self._layout_textures()
+
+        border = options.extrude * 2 + options.padding
+        sizes = [self._texture_size(get_image_size(texture.img_path), options.lock_size) for texture in textures]
+        rects = [
+            AtlasPackerRect(width=width + border, height=height + border, row=texture.row, column=texture.column)
+            for texture, (width, height) in zip(textures, sizes)
+        ]
+
+        packer = get_packer(
+            options.packer,
+            allow_rotation=options.allow_rotation,
+            power_of_two=options.power_of_two,
+            max_size=options.max_size,
+            padding=options.padding,
+        )
+        placements = packer.pack(rects)
+        page_sizes: list[list[int]] = []
+
+        for texture, (width, height), rect, placement in zip(textures, sizes, rects, placements):
+            rect_width, rect_height = rect.width, rect.height
+            if placement.rotated:
+                width, height = height, width
+                rect_width, rect_height = rect_height, rect_width
+
+            layout.add(texture, GenerateAtlasCoordTexture(
+                x=placement.x + options.extrude,
+                y=placement.y + options.extrude,
+                width=width,
+                height=height,
+                rotated=placement.rotated,
+                page=placement.page,
+            ))
+
+            while len(page_sizes) <= placement.page:
+                page_sizes.append([0, 0])
+
+            page_size = page_sizes[placement.page]
+            page_size[0] = max(page_size[0], placement.x + rect_width)
+            page_size[1] = max(page_size[1], placement.y + rect_height)
+
+        for page_width, page_height in page_sizes:
+            # there is nothing to keep apart after the last texture
+            page_width = max(page_width - options.padding, 0)
+            page_height = max(page_height - options.padding, 0)
+
+            if options.power_of_two:
+                page_width = next_power_of_two(page_width)
+                page_height = next_power_of_two(page_height)
+
+            layout.page_sizes.append((page_width, page_height))
+
+        return layout
+
+    def atlas_build_key(self, options: GenerateAtlasOptions = None) -> str:
+        """Changes whenever generate_atlas would produce a different result."""
+        if options is None:
+            options = GenerateAtlasOptions()
+
+        return atlas_build_key(
+            atlas_build_options(options),
+            (
+                (texture.row, texture.column, texture.label, get_content_hash(texture.img_path))
+                for texture in self._layout_textures()
+            ),
+        )
+
+    def _layout_textures(self) -> list[AtlasTexture]:
+        return list(self.texture_store.iter_rows())
+
+    def _save_atlas_pages(self, layout: GenerateAtlasLayout, options: GenerateAtlasOptions, page_file_paths: list[Path]):
+        for page_file_path, atlas in zip(page_file_paths, self._composite_atlas_pages(layout, options)):
+            atlas.save(page_file_path)
+            atlas.close()
+
+    def _patch_atlas_pages(
+        self,
+        items: list[tuple[AtlasTexture, GenerateAtlasCoordTexture]],
+        options: GenerateAtlasOptions,
+        page_file_paths: list[Path],
+    ):
+        items = sorted(items, key=lambda item: item[1].page)
+        imgs = imap_ordered(
+            self._layout_image_opener(options),
+            items,
+            workers=options.workers,
+        )
+        atlas = None
+        atlas_page = None
+
+        for (texture, coord), img in zip(items, imgs):
+            if coord.page != atlas_page:
+                if atlas is not None:
+                    atlas.save(page_file_paths[atlas_page])
+                    atlas.close()
+
+                with Image.open(page_file_paths[coord.page]) as page_img:
+                    atlas = page_img.convert("RGBA")
+                atlas_page = coord.page
+
+            # paste without a mask replaces the old pixels, alpha included
+            atlas.paste(img, (coord.x, coord.y))
+
+            if options.extrude:
+                _extrude_image(atlas, img, coord.x, coord.y, options.extrude)
+
+        if atlas is not None:
+            atlas.save(page_file_paths[atlas_page])
+            atlas.close()
+
+    def _composite_atlas_bands(
+        self,
+        items: list[tuple[AtlasTexture, GenerateAtlasCoordTexture]],
+        page_size: tuple[int, int],
+        options: GenerateAtlasOptions,
+        band_height: int,
+    ) -> Iterator[Image.Image]:
+        width, height = page_size
+        extrude = options.extrude
+        # decoded in the order the bands need them, every texture only once
+        items = sorted(items, key=lambda item: item[1].y)
+        imgs = imap_ordered(
+            self._layout_image_opener(options),
+            items,
+            workers=options.workers,
+        )
+        next_item = 0
+        active: list[tuple[GenerateAtlasCoordTexture, Image.Image]] = []
+
+        for band_y in range(0, height, band_height):
+            band_end = min(band_y + band_height, height)
+            band = Image.new(mode="RGBA", size=(width, band_end - band_y))
+
+            while next_item < len(items) and items[next_item][1].y - extrude < band_end:
+                active.append((items[next_item][1], next(imgs)))
+                next_item += 1
+
+            for coord, img in active:
+                band.paste(img, (coord.x, coord.y - band_y))
+
+                if extrude:
+                    _extrude_image(band, img, coord.x, coord.y - band_y, extrude)
+
+            active = [(coord, img) for coord, img in active if coord.y + coord.height + extrude > band_end]
+
+            yield band
+
+    def _composite_atlas_pages(self, layout: GenerateAtlasLayout, options: GenerateAtlasOptions) -> Iterator[Image.Image]:
+        if options.backend == "numpy":
+            yield from self._composite_atlas_pages_numpy(layout, options)
+            return
+
+        for page, page_size in enumerate(layout.page_sizes):
+            atlas = Image.new(mode="RGBA", size=page_size)
+            page_items = layout.page_items(page)
+
+            imgs = imap_ordered(
+                self._layout_image_opener(options),
+                page_items,
+                workers=options.workers,
+            )
+
+            for (texture, coord), img in zip(page_items, imgs):
+                atlas.paste(img, (coord.x, coord.y))
+
+                if options.extrude:
+                    _extrude_image(atlas, img, coord.x, coord.y, options.extrude)
+
+            yield atlas
+
+    def _composite_atlas_pages_numpy(
+        self,
+        layout: GenerateAtlasLayout,
+        options: GenerateAtlasOptions,
+    ) -> Iterator[Image.Image]:
+        numpy_backend.require_numpy()
+
+        for page, page_size in enumerate(layout.page_sizes):
+            page_items = layout.page_items(page)
+            # the whole page is premultiplied at once after compositing
+            imgs = imap_ordered(
+                self._layout_image_opener(options, premultiply_alpha=False),
+                page_items,
+                workers=options.workers,
+            )
+
+            yield numpy_backend.composite_page(
+                zip((coord for _, coord in page_items), imgs),
+                page_size,
+                extrude=options.extrude,
+                premultiply_alpha=options.premultiply_alpha,
+            )
+
+    def _layout_image_opener(
+        self,
+        options: GenerateAtlasOptions,
+        premultiply_alpha: bool = None,
+    ) -> Callable[[tuple[AtlasTexture, GenerateAtlasCoordTexture]], Image.Image]:
+        if premultiply_alpha is None:
+            premultiply_alpha = options.premultiply_alpha
+
+        return partial(self._open_layout_image, lock_size=options.lock_size, premultiply_alpha=premultiply_alpha)
+
+    @staticmethod
+    def _texture_size(size: tuple[int, int], lock_size: GenerateAtlasOptionsSize | None) -> tuple[int, int]:
+        width, height = size
+
+        if lock_size is not None:
+            width = lock_size.width or width
+            height = lock_size.height or height
+
+        return width, height
+
+    def _open_layout_image(
+        self,
+        layout_item: tuple[AtlasTexture, GenerateAtlasCoordTexture],
+        lock_size: GenerateAtlasOptionsSize | None,
+        premultiply_alpha: bool = False,
+    ) -> Image.Image:
+        texture, coord = layout_item
+
+        with Image.open(texture.img_path) as img:
+            if lock_size is not None and (lock_size.width or lock_size.height):
+                img = img.resize(self._texture_size(img.size, lock_size))
+
+            img = img.convert("RGBA")
+
+        if premultiply_alpha:
+            img = Image.frombytes("RGBA", img.size, img.convert("RGBa").tobytes())
+
+        if coord.rotated:
+            img = img.transpose(Image.Transpose.ROTATE_270)
+
+        return img
 
     def __len__(self):
         return len(self.texture_store)
@@ -1,11 +1,28 @@
-from typing import overload
+import threading
+from contextlib import contextmanager
+from functools import partial
+from itertools import islice
+from typing import Callable, Iterable, Iterator, overload
 from pathlib import Path
-from sqlmodel import SQLModel, Session, create_engine, select
+from sqlalchemy import delete, event, insert
+from sqlmodel import Session, create_engine, select
 
+from atlas_texture_creator.db.migrations import migrate
 from atlas_texture_creator.db.models import Collection, Texture
 from atlas_texture_creator.atlas_collection import AtlasCollection
 from atlas_texture_creator.atlas_texture import AtlasTexture
-from atlas_texture_creator.types import AtlasManagerConfig
+from atlas_texture_creator.types import AtlasManagerConfig, AtlasManagerConfigDB
+
+
+# SQLite cannot name the columns of a VALUES alias, the columns of a CTE it can
+_UPDATE_TEXTURES_SQL = """
+WITH new_texture("row", "column", path, label) AS (VALUES {values})
+UPDATE texture SET path = new_texture.path, label = new_texture.label
+FROM new_texture
+WHERE texture.collection_id = (SELECT id FROM collection WHERE name = ?)
+    AND texture."row" = new_texture."row" AND texture."column" = new_texture."column"
+    AND (texture.path != new_texture.path OR texture.label != new_texture.label)
+"""
 
 
 class AtlasManager:
@@ -15,6 +32,34 @@ class AtlasManager:
         self.config = config
         self._load_config()
         self.db_engine = self._get_db_engine()
+        # the session of the transaction() running in the current thread
+        self._local = threading.local()
+
+    @contextmanager
+    def transaction(self) -> Iterator[Session]:
+        """Unit of work, every AtlasManager call inside shares its session and connection.
+
+        Commits once when the block ends and rolls everything back on an exception.
+        A nested transaction() joins the outer one.
+        """
+        session = getattr(self._local, "session", None)
+
+        if session is not None:
+            yield session
+            session.flush()
+            return
+
+        with Session(self.db_engine) as session:
+            self._local.session = session
+
+            try:
+                yield session
+                session.commit()
+            except BaseException:
+                session.rollback()
+                raise
+            finally:
+                self._local.session = None
 
     @overload
     def create_collection(self, collection_name: str) -> AtlasCollection: ...
@@ -28,39 +73,45 @@ class AtlasManager:
 
         atlas_collection_model = Collection(name=atlas_collection.name)
 
-        with Session(self.db_engine) as session:
+        with self.transaction() as session:
             session.add(atlas_collection_model)
-            session.commit()
 
         return atlas_collection
 
     def update_collection(self, collection_name: str, new_collection: AtlasCollection) -> AtlasCollection:
-        with Session(self.db_engine) as session:
+        with self.transaction() as session:
             collection_model = self._load_collection_model(session, collection_name)
             collection_model.update(new_collection)
 
             session.add(collection_model)
-            session.commit()
+            session.flush()
             session.refresh(collection_model)
 
             return self.load_collection(collection_model.name)
 
-    def delete_collection(self, collection_name: str):
-        with (Session(self.db_engine) as session):
-            collection_model = self._load_collection_model(session, collection_name)
+    def delete_collection(self, collection_name: str, vacuum: bool = False):
+        """Deletes the collection and its textures with one DELETE each, no row is loaded.
+
+        vacuum gives the freed pages back to the filesystem, if the database uses auto_vacuum=INCREMENTAL.
+        It runs once the delete is committed, so inside an outer transaction() the pages stay free until the next
+        vacuum.
+        """
+        with self.transaction() as session:
+            collection_ids = select(Collection.id).where(Collection.name == collection_name)
+            connection = session.connection()
 
-            textures_statement = select(Texture).where(Texture.collection_id == collection_model.id)
-            texture_models = session.exec(textures_statement)
-            for texture_model in texture_models:
-                session.delete(texture_model)
+            connection.execute(delete(Texture).where(Texture.collection_id.in_(collection_ids.scalar_subquery())))
+            connection.execute(delete(Collection).where(Collection.name == collection_name))
 
-            session.delete(collection_model)
-            session.commit()
+        if vacuum and getattr(self._local, "session", None) is None:
+            with self.db_engine.connect() as connection:
+                # execute steps incremental_vacuum once, which frees a single page, executescript steps it to the end
+                connection.connection.driver_connection.executescript("PRAGMA incremental_vacuum")
 
     def list_collections(self) -> list[str]:
         atlas_collections: list[str] = []
 
-        with Session(self.db_engine) as session:
+        with self.transaction() as session:
             statement = select(Collection)
             atlas_collection_models = session.exec(statement)
 
@@ -69,23 +120,46 @@ class AtlasManager:
 
         return atlas_collections
 
-    def load_collection(self, collection_name: str) -> AtlasCollection | None:
-        with Session(self.db_engine) as session:
-            collection_model = self._load_collection_model(session, collection_name)
-
-            if collection_model is None:
-                return
-
-            collection_name = collection_model.name
-            atlas_collection = AtlasCollection(collection_name)
-
-            textures = self.load_textures(collection_name)
+    def load_collection(self, collection_name: str, validate: bool = False) -> AtlasCollection | None:
+        """Loads the collection and its textures with one SELECT.
+
+        The textures keep their stored row and column, validate checks that every texture file exists.
+        """
+        with self.transaction() as session:
+            rows = self._select_collection_textures(session, collection_name).all()
+
+        if len(rows) == 0:
+            return
+
+        atlas_collection = AtlasCollection(rows[0].collection_name)
+        textures = None
+
+        if validate:
+            # AtlasTexture validates the path of every texture
+            textures = [self._texture_from_row(row, validate) for row in rows if row.id is not None]
+
+        try:
+            if textures is None:
+                # plain rows, no AtlasTexture and only one Path per distinct path is built
+                atlas_collection.load_texture_rows([
+                    (path, label, row, column)
+                    for _, texture_id, path, label, row, column in rows
+                    if texture_id is not None
+                ])
+            else:
+                atlas_collection.load_textures(textures, keep_coords=True)
+        except ValueError:
+            # stored coords which are not the grid coords in insertion order, place the textures again
+            if textures is None:
+                textures = [self._texture_from_row(row, validate) for row in rows if row.id is not None]
+
+            atlas_collection = AtlasCollection(rows[0].collection_name)
             atlas_collection.load_textures(textures)
 
-            return atlas_collection
+        return atlas_collection
 
     def add_texture(self, collection_name: str, texture: AtlasTexture):
-        with Session(self.db_engine) as session:
+        with self.transaction() as session:
             atlas_collection = self._load_collection_model(session, collection_name)
             texture_model = Texture(
                 collection_id=atlas_collection.id,
@@ -96,44 +170,157 @@ class AtlasManager:
             )
 
             session.add(texture_model)
-            session.commit()
-
-    def load_textures(self, collection_name: str) -> list[AtlasTexture]:
-        textures: list[AtlasTexture] = []
 
-        with Session(self.db_engine) as session:
+    def add_textures(
+        self,
+        collection_name: str,
+        textures: Iterable[AtlasTexture],
+        chunk_size: int = 1000,
+        on_progress: Callable[[int], None] = None,
+    ) -> int:
+        """Inserts all textures in one transaction, chunk_size rows per executemany.
+
+        on_progress is called with the number of inserted textures after every chunk.
+        Returns the number of inserted textures.
+        """
+        textures = iter(textures)
+        inserted = 0
+
+        with self.transaction() as session:
             atlas_collection = self._load_collection_model(session, collection_name)
 
-            for texture_model in atlas_collection.textures:
-                texture = AtlasTexture(
-                    path=Path(texture_model.path),
-                    label=texture_model.label
-                )
-                texture.set_coord(texture_model.column, texture_model.row)
-                textures.append(texture)
-
-        return textures
+            while chunk := list(islice(textures, chunk_size)):
+                session.connection().execute(insert(Texture), [
+                    {
+                        "collection_id": atlas_collection.id,
+                        "path": str(texture.path),
+                        "label": texture.label,
+                        "row": texture.row,
+                        "column": texture.column,
+                    }
+                    for texture in chunk
+                ])
+                inserted += len(chunk)
+
+                if on_progress is not None:
+                    on_progress(inserted)
+
+        return inserted
+
+    def load_textures(self, collection_name: str, validate: bool = False) -> list[AtlasTexture]:
+        with self.transaction() as session:
+            rows = self._select_collection_textures(session, collection_name).all()
+
+        return [self._texture_from_row(row, validate) for row in rows if row.id is not None]
+
+    def iter_textures(
+        self,
+        collection_name: str,
+        batch_size: int = 1000,
+        validate: bool = False,
+    ) -> Iterator[AtlasTexture]:
+        """Yields the textures in insertion order without loading all of them, batch_size rows at a time.
+
+        The rows come from one query on a connection of its own, which stays open until the iterator is
+        exhausted or closed.
+        """
+        statement = self._collection_textures_statement(collection_name)
+
+        with self.db_engine.connect() as connection:
+            result = connection.execution_options(yield_per=batch_size).execute(statement)
+
+            for rows in result.partitions():
+                for row in rows:
+                    if row.id is not None:
+                        yield self._texture_from_row(row, validate)
+
+    def load_textures_window(
+        self,
+        collection_name: str,
+        rows: range,
+        columns: range,
+        validate: bool = False,
+    ) -> list[AtlasTexture]:
+        """The textures with row in rows and column in columns, in insertion order."""
+        if len(rows) == 0 or len(columns) == 0:
+            return []
+
+        statement = self._collection_textures_statement(collection_name) \
+            .where(Texture.row.between(min(rows), max(rows))) \
+            .where(Texture.column.between(min(columns), max(columns)))
+
+        with self.transaction() as session:
+            texture_rows = session.connection().execute(statement).all()
+
+        return [
+            self._texture_from_row(row, validate)
+            for row in texture_rows
+            # ranges with a step have gaps between min and max
+            if row.row in rows and row.column in columns
+        ]
 
     def update_texture(self, collection_name: str, texture: AtlasTexture):
-        with Session(self.db_engine) as session:
-            atlas_collection = self._load_collection_model(session, collection_name)
+        self.update_textures(collection_name, [texture])
 
-            statement = select(Texture) \
-                .where(Texture.collection_id == atlas_collection.id) \
-                .where(Texture.row == texture.row) \
-                .where(Texture.column == texture.column)
-            texture_model = session.exec(statement).first()
+    def update_textures(self, collection_name: str, textures: Iterable[AtlasTexture], chunk_size: int = 1000) -> int:
+        """Sets path and label of the stored textures at the row and column of textures, in one transaction.
 
-            texture_model.path = str(texture.path)
-            texture_model.label = texture.label
+        Every chunk is one UPDATE ... FROM statement over the VALUES of its textures. Rows whose path and label
+        are already the same are not written. Returns the number of changed textures.
+        """
+        textures = iter(textures)
+        updated = 0
 
-            session.add(texture_model)
-            session.commit()
-            session.refresh(texture_model)
+        with self.transaction() as session:
+            connection = session.connection()
+
+            while chunk := list(islice(textures, chunk_size)):
+                parameters = [
+                    value
+                    for texture in chunk
+                    for value in (texture.row, texture.column, str(texture.path), texture.label)
+                ]
+                parameters.append(collection_name)
+                statement = _UPDATE_TEXTURES_SQL.format(values=", ".join(["(?, ?, ?, ?)"] * len(chunk)))
+
+                # plain SQL, compiling a VALUES construct with thousands of rows costs more than running it
+                connection.exec_driver_sql(statement, tuple(parameters))
+                # sqlite3 has no rowcount for statements starting with WITH
+                updated += connection.exec_driver_sql("SELECT changes()").scalar()
+
+        return updated
 
     def close_all_connections(self):
         self.db_engine.dispose()
 
+    @classmethod
+    def _select_collection_textures(cls, session: Session, collection_name: str):
+        # plain rows from the connection, the ORM has no entities to build here
+        return session.connection().execute(cls._collection_textures_statement(collection_name))
+
+    @staticmethod
+    def _collection_textures_statement(collection_name: str):
+        """One row per texture in insertion order, or a single row without texture for an empty collection."""
+        return select(
+            Collection.name.label("collection_name"),
+            Texture.id,
+            Texture.path,
+            Texture.label,
+            Texture.row,
+            Texture.column,
+        ) \
+            .outerjoin(Texture, Texture.collection_id == Collection.id) \
+            .where(Collection.name == collection_name) \
+            .order_by(Texture.id)
+
+    @staticmethod
+    def _texture_from_row(row, validate: bool) -> AtlasTexture:
+        if validate:
+            return AtlasTexture(path=Path(row.path), label=row.label, row=row.row, column=row.column)
+
+        # skips the validation, the path is not checked on the filesystem
+        return AtlasTexture.unchecked(path=Path(row.path), label=row.label, row=row.row, column=row.column)
+
     @staticmethod
     def _load_collection_model(session: Session, collection_name: str) -> Collection:
         statement = select(Collection).where(Collection.name == collection_name)
@@ -148,8 +335,34 @@ class AtlasManager:
 
     def _get_db_engine(self):
         sqlite_url = f"sqlite:///{self.sqlite_file}"
-        engine = create_engine(sqlite_url)
-        SQLModel.metadata.create_all(engine)
-        engine.dispose()
+        engine = create_engine(sqlite_url, **self._pool_options())
+
+        sqlite_pragmas = self._sqlite_pragmas()
+        if sqlite_pragmas:
+            event.listen(engine, "connect", partial(_apply_sqlite_pragmas, sqlite_pragmas=sqlite_pragmas))
+
+        migrate(engine)
 
         return engine
+
+    def _sqlite_pragmas(self) -> dict[str, str | int]:
+        if self.config is None or self.config.db is None:
+            return {}
+
+        return self.config.db.sqlite_pragmas()
+
+    def _pool_options(self) -> dict:
+        if self.config is None or self.config.db is None:
+            return {}
+
+        return self.config.db.dict(include=AtlasManagerConfigDB.pool_option_names(), exclude_none=True)
+
+
+def _apply_sqlite_pragmas(dbapi_connection, _connection_record, sqlite_pragmas: dict[str, str | int]):
+    cursor = dbapi_connection.cursor()
+
+    # the values are validated by AtlasManagerConfigDBPragmas, PRAGMA does not take parameters
+    for name, value in sqlite_pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+
+    cursor.close()
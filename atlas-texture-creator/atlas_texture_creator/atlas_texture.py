@@ -1,14 +1,88 @@
-from pydantic import FilePath, BaseModel
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Iterable, Iterator
 
-from atlas_texture_creator.types import AtlasGridItem
+from pydantic import BaseModel, errors, validator
+
+from atlas_texture_creator.types import AtlasGridItem, PathValidation
+
+
+_default_path_validation: PathValidation = "strict"
+_path_validation: ContextVar[PathValidation | None] = ContextVar("path_validation", default=None)
+
+
+def get_path_validation() -> PathValidation:
+    return _path_validation.get() or _default_path_validation
+
+
+def set_path_validation(mode: PathValidation):
+    """Sets the path validation of every thread, path_validation() overrides it."""
+    global _default_path_validation
+    _default_path_validation = mode
+
+
+@contextmanager
+def path_validation(mode: PathValidation) -> Iterator[None]:
+    """Sets the path validation inside the block, for the current thread or asyncio task only.
+
+    With "strict", the path of every texture is stat'ed when the texture is created or updated, like FilePath.
+    "lazy" skips it. A missing file then shows up when the texture is opened, or in validate_paths().
+    """
+    token = _path_validation.set(mode)
+
+    try:
+        yield
+    finally:
+        _path_validation.reset(token)
+
+
+def check_file_path(path: Path | str):
+    path = Path(path)
+
+    if not path.exists():
+        raise errors.PathNotExistsError(path=path)
+    if not path.is_file():
+        raise errors.PathNotAFileError(path=path)
+
+
+def missing_paths(paths: Iterable[Path | str], workers: int = 16) -> set[str]:
+    """Stats every distinct path once, workers at a time, and returns the ones which are no file."""
+    unique_paths = list({os.fspath(path) for path in paths})
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        is_files = executor.map(os.path.isfile, unique_paths)
+
+        return {path for path, is_file in zip(unique_paths, is_files) if not is_file}
 
 
 class AtlasTextureModel(BaseModel):
-    path: FilePath
+    path: Path
     label: str
 
+    @validator("path")
+    def path_is_file(cls, path: Path) -> Path:
+        if get_path_validation() == "strict":
+            check_file_path(path)
+
+        return path
+
 
 class AtlasTexture(AtlasGridItem, AtlasTextureModel):
+    @classmethod
+    def unchecked(cls, path: Path, label: str, column: int, row: int) -> "AtlasTexture":
+        """Builds the texture from already validated values, without running any validator.
+
+        Cheaper than construct(), which still looks at the defaults of every field.
+        """
+        texture = cls.__new__(cls)
+        object.__setattr__(texture, "__dict__", {"path": path, "label": label, "column": column, "row": row})
+        object.__setattr__(texture, "__fields_set__", set(_ATLAS_TEXTURE_FIELDS))
+
+        return texture
+
     def get_coord(self) -> AtlasGridItem:
         atlas_grid_item = AtlasGridItem(
             column=self.column,
@@ -36,3 +110,6 @@ class AtlasTexture(AtlasGridItem, AtlasTextureModel):
 
         self.__class__.validate(self.__dict__ | new_atlas_texture_dict)
         self.__dict__.update(**new_atlas_texture_dict)
+
+
+_ATLAS_TEXTURE_FIELDS = tuple(AtlasTexture.__fields__)
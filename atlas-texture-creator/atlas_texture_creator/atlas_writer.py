@@ -0,0 +1,100 @@
+import struct
+import zlib
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Literal
+
+from PIL import Image
+
+
+AtlasStreamFormat = Literal["png", "raw"]
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# 8 bit depth, RGBA color type, default compression, filter and no interlace
+PNG_IHDR_RGBA = (8, 6, 0, 0, 0)
+PNG_FILTER_NONE = b"\x00"
+PNG_IDAT_SIZE = 1024 * 1024
+
+
+class AtlasStreamWriter(ABC):
+    """Writes an RGBA image from top to bottom, band by band, without ever having the whole image."""
+    def __init__(self, f: BinaryIO, size: tuple[int, int]):
+        self.f = f
+        self.width, self.height = size
+        self.rows_written = 0
+
+    def write_band(self, band: Image.Image):
+        if band.mode != "RGBA" or band.width != self.width:
+            raise ValueError(f"band has to be RGBA and {self.width} pixels wide")
+        if self.rows_written + band.height > self.height:
+            raise ValueError("more rows written than the image is high")
+
+        self._write_rows(band.tobytes(), band.height)
+        self.rows_written += band.height
+
+    def close(self):
+        if self.rows_written != self.height:
+            raise ValueError(f"only {self.rows_written} of {self.height} rows were written")
+
+    @abstractmethod
+    def _write_rows(self, data: bytes, rows: int):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+
+
+class RawStreamWriter(AtlasStreamWriter):
+    def _write_rows(self, data: bytes, rows: int):
+        self.f.write(data)
+
+
+class PNGStreamWriter(AtlasStreamWriter):
+    """Every scanline uses the PNG filter type None, filtering would need the whole band in Python."""
+    def __init__(self, f: BinaryIO, size: tuple[int, int], compress_level: int = 6):
+        super().__init__(f, size)
+        self._compressor = zlib.compressobj(compress_level)
+        self._idat = bytearray()
+
+        self.f.write(PNG_SIGNATURE)
+        self._write_chunk(b"IHDR", struct.pack(">II5B", self.width, self.height, *PNG_IHDR_RGBA))
+
+    def _write_rows(self, data: bytes, rows: int):
+        row_size = self.width * 4
+
+        for row in range(rows):
+            self._idat += self._compressor.compress(PNG_FILTER_NONE)
+            self._idat += self._compressor.compress(data[row * row_size:(row + 1) * row_size])
+
+        if len(self._idat) >= PNG_IDAT_SIZE:
+            self._flush_idat()
+
+    def close(self):
+        super().close()
+
+        self._idat += self._compressor.flush()
+        self._flush_idat()
+        self._write_chunk(b"IEND", b"")
+
+    def _flush_idat(self):
+        if self._idat:
+            self._write_chunk(b"IDAT", bytes(self._idat))
+            self._idat.clear()
+
+    def _write_chunk(self, chunk_type: bytes, data: bytes):
+        self.f.write(struct.pack(">I", len(data)))
+        self.f.write(chunk_type)
+        self.f.write(data)
+        self.f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(chunk_type))))
+
+
+def get_stream_writer(image_format: AtlasStreamFormat, f: BinaryIO, size: tuple[int, int]) -> AtlasStreamWriter:
+    if image_format == "png":
+        return PNGStreamWriter(f, size)
+    if image_format == "raw":
+        return RawStreamWriter(f, size)
+
+    raise ValueError(f"unknown stream format {image_format}, use png or raw")
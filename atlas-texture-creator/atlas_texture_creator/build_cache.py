@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Iterable, TYPE_CHECKING
+
+from PIL import Image
+
+from atlas_texture_creator.content_hash import ContentHash
+from atlas_texture_creator.types import GenerateAtlasReturnType, GenerateAtlasReturnTypeOut
+
+if TYPE_CHECKING:
+    from atlas_texture_creator.atlas_collection import GenerateAtlasTextureCoords
+
+
+AtlasBuildKey = str
+
+ATLAS_BUILD_CACHE_IMAGE_SUFFIX = ".png"
+ATLAS_BUILD_CACHE_COORDS_SUFFIX = ".json"
+
+
+class AtlasBuildCache:
+    """Generated atlases stored by build key in cache_dir.
+
+    The least recently used entries are evicted once all entries together are bigger than max_bytes.
+    The mtime of the image file of an entry is its last use.
+    """
+    def __init__(self, cache_dir: Path | str, max_bytes: int = 1024 ** 3):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: AtlasBuildKey) -> tuple[Image.Image, GenerateAtlasReturnType] | None:
+        image_path, coords_path = self._entry_paths(key)
+
+        try:
+            with Image.open(image_path) as img:
+                img.load()
+            with open(coords_path) as f:
+                coords = GenerateAtlasReturnTypeOut.parse_raw(f.read()).__root__
+        except (OSError, ValueError):
+            return None
+
+        os.utime(image_path)
+
+        return img, coords
+
+    def put(self, key: AtlasBuildKey, atlas: Image.Image, textures_coord: "GenerateAtlasTextureCoords"):
+        image_path, coords_path = self._entry_paths(key)
+
+        # written to temporary files first, so parallel builds never read half written entries
+        self._write_atomic(coords_path, lambda f: f.write(textures_coord.json().encode()))
+        self._write_atomic(image_path, lambda f: atlas.save(f, format="PNG", compress_level=1))
+
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total_bytes = 0
+
+        for image_path in self.cache_dir.glob(f"*{ATLAS_BUILD_CACHE_IMAGE_SUFFIX}"):
+            coords_path = image_path.with_suffix(ATLAS_BUILD_CACHE_COORDS_SUFFIX)
+
+            try:
+                image_stat = image_path.stat()
+                entry_bytes = image_stat.st_size + coords_path.stat().st_size
+            except OSError:
+                continue
+
+            entries.append((image_stat.st_mtime_ns, entry_bytes, image_path, coords_path))
+            total_bytes += entry_bytes
+
+        entries.sort()
+
+        for _, entry_bytes, image_path, coords_path in entries:
+            if total_bytes <= self.max_bytes:
+                break
+
+            image_path.unlink(missing_ok=True)
+            coords_path.unlink(missing_ok=True)
+            total_bytes -= entry_bytes
+
+    def clear(self):
+        for key in self:
+            for file_path in self._entry_paths(key):
+                file_path.unlink(missing_ok=True)
+
+    def _entry_paths(self, key: AtlasBuildKey) -> tuple[Path, Path]:
+        return (
+            self.cache_dir / f"{key}{ATLAS_BUILD_CACHE_IMAGE_SUFFIX}",
+            self.cache_dir / f"{key}{ATLAS_BUILD_CACHE_COORDS_SUFFIX}",
+        )
+
+    @staticmethod
+    def _write_atomic(file_path: Path, write):
+        tmp_file_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.tmp")
+
+        try:
+            with open(tmp_file_path, "wb") as f:
+                write(f)
+            os.replace(tmp_file_path, file_path)
+        finally:
+            tmp_file_path.unlink(missing_ok=True)
+
+    def __contains__(self, key: AtlasBuildKey):
+        return all(file_path.exists() for file_path in self._entry_paths(key))
+
+    def __iter__(self):
+        for image_path in self.cache_dir.glob(f"*{ATLAS_BUILD_CACHE_IMAGE_SUFFIX}"):
+            yield image_path.stem
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def atlas_build_key(options: dict, textures: Iterable[tuple[int, int, str, ContentHash]]) -> AtlasBuildKey:
+    """Hashes the build options and the (row, column, label, content hash) of every texture in layout order."""
+    key_hash = hashlib.blake2b(digest_size=20)
+    key_hash.update(json.dumps(options, sort_keys=True).encode())
+
+    for texture in textures:
+        key_hash.update(json.dumps(texture).encode())
+
+    return key_hash.hexdigest()
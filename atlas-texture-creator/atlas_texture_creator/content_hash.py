@@ -0,0 +1,45 @@
+import hashlib
+import os
+from pathlib import Path
+
+
+ContentHash = str
+
+
+class ContentHashCache:
+    def __init__(self):
+        self._hashes: dict[str, tuple[int, int, ContentHash]] = {}
+
+    def get(self, path: Path | str) -> ContentHash:
+        path = os.fspath(path)
+        stat = os.stat(path)
+
+        cached = self._hashes.get(path)
+        if cached is not None:
+            mtime, file_size, content_hash = cached
+
+            if mtime == stat.st_mtime_ns and file_size == stat.st_size:
+                return content_hash
+
+        content_hash = hash_file(path)
+        self._hashes[path] = (stat.st_mtime_ns, stat.st_size, content_hash)
+
+        return content_hash
+
+    def clear(self):
+        self._hashes.clear()
+
+    def __len__(self):
+        return len(self._hashes)
+
+
+content_hash_cache = ContentHashCache()
+
+
+def get_content_hash(path: Path | str) -> ContentHash:
+    return content_hash_cache.get(path)
+
+
+def hash_file(path: Path | str) -> ContentHash:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16)).hexdigest()
@@ -0,0 +1,50 @@
+import warnings
+from typing import Callable
+
+from sqlalchemy import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import SQLModel
+
+from atlas_texture_creator.db.models import Collection, Texture
+
+
+def _add_lookup_indexes(connection: Connection) -> bool:
+    for index in Texture.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
+    for index in Collection.__table__.indexes:
+        try:
+            with connection.begin_nested():
+                index.create(connection, checkfirst=True)
+        except IntegrityError:
+            warnings.warn(
+                f"{index.name} was not created, the database has collections with the same name. "
+                f"Rename them and open the database again to get the index."
+            )
+            return False
+
+    return True
+
+
+# MIGRATIONS[i] upgrades schema version i to i + 1, the version is stored in PRAGMA user_version.
+# A migration returns False if it could not finish, it runs again the next time the database is opened.
+MIGRATIONS: list[Callable[[Connection], bool]] = [
+    _add_lookup_indexes,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(engine: Engine):
+    """Creates missing tables and brings databases of older versions up to SCHEMA_VERSION."""
+    SQLModel.metadata.create_all(engine)
+
+    with engine.begin() as connection:
+        old_schema_version = schema_version = connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+        for migration in MIGRATIONS[schema_version:]:
+            if not migration(connection):
+                break
+            schema_version += 1
+
+        if schema_version != old_schema_version:
+            connection.exec_driver_sql(f"PRAGMA user_version={schema_version}")
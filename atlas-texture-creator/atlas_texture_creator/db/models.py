@@ -1,4 +1,5 @@
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 
 from atlas_texture_creator.atlas_collection import AtlasCollection, AtlasCollectionModel
@@ -6,8 +7,16 @@ from atlas_texture_creator.atlas_texture import AtlasTexture
 
 
 class Collection(AtlasCollection, SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_collection_name", "name", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    textures: list["Texture"] = Relationship(back_populates="collection")
+    # in insertion order, the grid of a loaded collection is rebuilt from it
+    textures: list["Texture"] = Relationship(
+        back_populates="collection",
+        sa_relationship_kwargs={"order_by": "Texture.id"},
+    )
 
     def update(self, new_atlas_collection: AtlasCollection):
         new_atlas_collection_model = AtlasCollectionModel(**new_atlas_collection.dict())
@@ -18,6 +27,10 @@ class Collection(AtlasCollection, SQLModel, table=True):
 
 
 class Texture(AtlasTexture, SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_texture_collection_id_row_column", "collection_id", "row", "column"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     collection_id: Optional[int] = Field(default=None, foreign_key="collection.id")
     collection: Optional[Collection] = Relationship(back_populates="textures")
@@ -0,0 +1,151 @@
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO
+
+from PIL import Image
+
+
+ImageSize = tuple[int, int]
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+JPEG_SOF_MARKERS = {
+    0xC0, 0xC1, 0xC2, 0xC3,
+    0xC5, 0xC6, 0xC7,
+    0xC9, 0xCA, 0xCB,
+    0xCD, 0xCE, 0xCF,
+}
+JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8}
+TGA_EXTENSIONS = {".tga", ".icb", ".vda", ".vst"}
+TGA_IMAGE_TYPES = {1, 2, 3, 9, 10, 11}
+TGA_DEPTHS = {1, 8, 15, 16, 24, 32}
+
+
+class ImageSizeCache:
+    def __init__(self):
+        self._sizes: dict[str, tuple[int, int, ImageSize]] = {}
+
+    def get(self, path: Path | str) -> ImageSize:
+        path = os.fspath(path)
+        stat = os.stat(path)
+
+        cached = self._sizes.get(path)
+        if cached is not None:
+            mtime, file_size, image_size = cached
+
+            if mtime == stat.st_mtime_ns and file_size == stat.st_size:
+                return image_size
+
+        image_size = probe_image_size(path)
+        self._sizes[path] = (stat.st_mtime_ns, stat.st_size, image_size)
+
+        return image_size
+
+    def clear(self):
+        self._sizes.clear()
+
+    def __len__(self):
+        return len(self._sizes)
+
+
+image_size_cache = ImageSizeCache()
+
+
+def get_image_size(path: Path | str) -> ImageSize:
+    return image_size_cache.get(path)
+
+
+def probe_image_size(path: Path | str) -> ImageSize:
+    with open(path, "rb") as f:
+        header = f.read(26)
+
+        if header.startswith(PNG_SIGNATURE):
+            size = _probe_png(header)
+        elif header.startswith(b"BM"):
+            size = _probe_bmp(header)
+        elif header.startswith(b"\xff\xd8"):
+            size = _probe_jpeg(f)
+        elif Path(path).suffix.lower() in TGA_EXTENSIONS:
+            size = _probe_tga(header)
+        else:
+            size = None
+
+    if size is None:
+        # Unknown format or unusual header: Image.open only parses the header as well
+        with Image.open(path) as img:
+            size = img.size
+
+    return size
+
+
+def _probe_png(header: bytes) -> ImageSize | None:
+    if len(header) < 24 or header[12:16] != b"IHDR":
+        return None
+
+    return struct.unpack(">II", header[16:24])
+
+
+def _probe_bmp(header: bytes) -> ImageSize | None:
+    if len(header) < 26:
+        return None
+
+    dib_header_size = struct.unpack("<I", header[14:18])[0]
+
+    if dib_header_size == 12:
+        return struct.unpack("<HH", header[18:22])
+    if dib_header_size >= 40:
+        width, height = struct.unpack("<ii", header[18:26])
+        return width, abs(height)
+
+    return None
+
+
+def _probe_jpeg(f: BinaryIO) -> ImageSize | None:
+    f.seek(2)
+
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            continue
+
+        marker = f.read(1)
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            return None
+
+        marker = marker[0]
+        if marker in JPEG_STANDALONE_MARKERS or marker == 0x00:
+            continue
+        if marker == 0xD9:
+            return None
+
+        segment_length_bytes = f.read(2)
+        if len(segment_length_bytes) < 2:
+            return None
+        segment_length = struct.unpack(">H", segment_length_bytes)[0]
+
+        if marker in JPEG_SOF_MARKERS:
+            sof = f.read(5)
+            if len(sof) < 5:
+                return None
+            height, width = struct.unpack(">HH", sof[1:5])
+            return width, height
+
+        f.seek(segment_length - 2, os.SEEK_CUR)
+
+
+def _probe_tga(header: bytes) -> ImageSize | None:
+    if len(header) < 18:
+        return None
+
+    colormap_type = header[1]
+    image_type = header[2]
+    depth = header[16]
+
+    if colormap_type not in (0, 1) or image_type not in TGA_IMAGE_TYPES or depth not in TGA_DEPTHS:
+        return None
+
+    return struct.unpack("<HH", header[12:16])
@@ -0,0 +1,73 @@
+from typing import Iterable, TYPE_CHECKING
+
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is an optional dependency
+    np = None
+
+if TYPE_CHECKING:
+    from atlas_texture_creator.types import GenerateAtlasCoordTexture
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+def require_numpy():
+    if np is None:
+        raise ImportError(
+            'the numpy backend needs numpy, install it with: pip install "atlas-texture-creator[numpy]"'
+        )
+
+
+def composite_page(
+    imgs: Iterable[tuple["GenerateAtlasCoordTexture", Image.Image]],
+    page_size: tuple[int, int],
+    extrude: int,
+    premultiply_alpha: bool,
+) -> Image.Image:
+    """Writes every texture into one preallocated uint8[height, width, 4] array with slice assignment."""
+    require_numpy()
+
+    width, height = page_size
+    canvas = np.zeros((height, width, 4), dtype=np.uint8)
+
+    for coord, img in imgs:
+        texture = np.asarray(img)
+        x, y = coord.x, coord.y
+        x_end, y_end = x + img.width, y + img.height
+
+        canvas[y:y_end, x:x_end] = texture
+
+        if extrude:
+            extrude_texture(canvas, texture, x, y, extrude)
+
+    if premultiply_alpha:
+        premultiply(canvas)
+
+    return Image.fromarray(canvas)
+
+
+def extrude_texture(canvas: "np.ndarray", texture: "np.ndarray", x: int, y: int, extrude: int):
+    """Repeats the border pixels of texture (written at x, y) extrude pixels outwards, corners included."""
+    height, width = texture.shape[:2]
+    x_end, y_end = x + width, y + height
+
+    canvas[y - extrude:y, x:x_end] = texture[:1]
+    canvas[y_end:y_end + extrude, x:x_end] = texture[-1:]
+    canvas[y:y_end, x - extrude:x] = texture[:, :1]
+    canvas[y:y_end, x_end:x_end + extrude] = texture[:, -1:]
+
+    canvas[y - extrude:y, x - extrude:x] = texture[0, 0]
+    canvas[y - extrude:y, x_end:x_end + extrude] = texture[0, -1]
+    canvas[y_end:y_end + extrude, x - extrude:x] = texture[-1, 0]
+    canvas[y_end:y_end + extrude, x_end:x_end + extrude] = texture[-1, -1]
+
+
+def premultiply(canvas: "np.ndarray"):
+    """Multiplies the color channels with alpha in place, rounded exactly like Pillow's RGBA to RGBa conversion."""
+    alpha = canvas[..., 3:4].astype(np.uint16)
+    color = canvas[..., :3].astype(np.uint16) * alpha + 128
+    canvas[..., :3] = ((color >> 8) + color) >> 8
@@ -0,0 +1,511 @@
+import math
+import warnings
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from typing import NamedTuple, Iterator
+
+
+class AtlasPackerRect(NamedTuple):
+    width: int
+    height: int
+    row: int = -1
+    column: int = -1
+
+
+class AtlasPackerPlacement(NamedTuple):
+    x: int
+    y: int
+    rotated: bool = False
+    page: int = 0
+
+
+AtlasPackerOrientation = tuple[int, int, bool]
+
+
+class AtlasPacker(ABC):
+    """Places rectangles on an atlas.
+
+    pack() gets the rectangles in the order the collection lays them out and must
+    return one placement per rectangle, in the same order. A rotated placement
+    occupies height x width on the atlas (rotated 90 degrees clockwise).
+
+    Without max_size everything goes onto one page of unbounded height. With
+    max_size, pages are at most max_size x max_size, with power_of_two at most the
+    largest power of two below or equal to max_size.
+
+    Every rect ends with padding pixels which keep it apart from the next one. At
+    the right and bottom edge of a page that padding is trimmed, so it may reach
+    past max_size.
+    """
+
+    def __init__(
+        self,
+        allow_rotation: bool = False,
+        power_of_two: bool = False,
+        max_size: int | None = None,
+        padding: int = 0,
+    ):
+        self.allow_rotation = allow_rotation
+        self.power_of_two = power_of_two
+        self.max_size = max_size
+        self.padding = padding
+
+    def max_extent(self) -> int | None:
+        """How far a rect may reach into a page, in both directions."""
+        if self.max_size is None:
+            return None
+
+        max_size = self.max_size
+        if self.power_of_two:
+            max_size = next_power_of_two(max_size + 1) // 2
+
+        return max_size + self.padding
+
+    @abstractmethod
+    def pack(self, rects: list[AtlasPackerRect]) -> list[AtlasPackerPlacement]:
+        pass
+
+
+class AtlasBinPacker(AtlasPacker):
+    """Packs the rectangles one by one into bins, a rect goes onto the first page whose bin it fits in."""
+
+    def pack(self, rects: list[AtlasPackerRect]) -> list[AtlasPackerPlacement]:
+        bin_width = self.bin_width(rects)
+        placements: list[AtlasPackerPlacement | None] = [None] * len(rects)
+        bins = []
+        # a bin never gets more room, so the pages a size did not fit into are skipped for it from then on
+        first_pages: dict[tuple[AtlasPackerOrientation, ...], int] = {}
+
+        for i in self._sort_order(rects, bin_width):
+            orientations = list(self._orientations(rects[i], bin_width))
+            if len(orientations) == 0:
+                raise ValueError(f"A texture of {rects[i].width}x{rects[i].height} does not fit into the atlas")
+
+            size = tuple(orientations)
+            for page in range(first_pages.get(size, 0), len(bins)):
+                position = bins[page].insert(orientations)
+
+                if position is not None:
+                    break
+            else:
+                page = len(bins)
+                bins.append(self._create_bin(rects, bin_width))
+                position = bins[page].insert(orientations)
+
+            first_pages[size] = page
+
+            x, y, rotated = position
+            placements[i] = AtlasPackerPlacement(x=x, y=y, rotated=rotated, page=page)
+
+        return placements
+
+    def bin_width(self, rects: list[AtlasPackerRect]) -> int:
+        area = 0
+        min_width = 0
+
+        for rect in rects:
+            area += rect.width * rect.height
+
+            rect_min_width = min(rect.width, rect.height) if self.allow_rotation else rect.width
+            if rect_min_width > min_width:
+                min_width = rect_min_width
+
+        # the width of the page, without the trimmed padding
+        width = max(min_width, math.ceil(math.sqrt(area))) - self.padding
+
+        if self.power_of_two:
+            width = next_power_of_two(width)
+
+        max_extent = self.max_extent()
+        if max_extent is not None:
+            width = min(width, max_extent - self.padding)
+
+        return width + self.padding
+
+    @abstractmethod
+    def _create_bin(self, rects: list[AtlasPackerRect], bin_width: int):
+        pass
+
+    def _sort_order(self, rects: list[AtlasPackerRect], bin_width: int) -> list[int]:
+        return sorted(
+            range(len(rects)),
+            key=lambda i: (max(rects[i].width, rects[i].height), rects[i].width * rects[i].height),
+            reverse=True,
+        )
+
+    def _orientations(self, rect: AtlasPackerRect, bin_width: int) -> Iterator[AtlasPackerOrientation]:
+        if self._fits(rect.width, rect.height, bin_width):
+            yield rect.width, rect.height, False
+        if self.allow_rotation and rect.width != rect.height and self._fits(rect.height, rect.width, bin_width):
+            yield rect.height, rect.width, True
+
+    def _fits(self, width: int, height: int, bin_width: int) -> bool:
+        max_extent = self.max_extent()
+
+        return width <= bin_width and (max_extent is None or height <= max_extent)
+
+
+class GridPacker(AtlasPacker):
+    """The classic square grid: every row of the collection is a vertical strip as wide as its widest texture.
+
+    With max_size, strips that are too high continue in a new strip and strips that don't fit
+    next to each other continue on a new page.
+    """
+
+    def pack(self, rects: list[AtlasPackerRect]) -> list[AtlasPackerPlacement]:
+        max_extent = self.max_extent()
+        strips: dict[int, list[int]] = {}
+
+        for i, rect in enumerate(rects):
+            if max_extent is not None and (rect.width > max_extent or rect.height > max_extent):
+                raise ValueError(f"A texture of {rect.width}x{rect.height} does not fit into the atlas")
+
+            strips.setdefault(rect.row, []).append(i)
+
+        placements: list[AtlasPackerPlacement | None] = [None] * len(rects)
+        page = 0
+        offset_x = 0
+
+        for strip in self._split_strips(rects, strips.values(), max_extent):
+            strip_width = max(rects[i].width for i in strip)
+
+            if max_extent is not None and offset_x + strip_width > max_extent:
+                page += 1
+                offset_x = 0
+
+            offset_y = 0
+            for i in strip:
+                placements[i] = AtlasPackerPlacement(x=offset_x, y=offset_y, page=page)
+                offset_y += rects[i].height
+
+            offset_x += strip_width
+
+        return placements
+
+    @staticmethod
+    def _split_strips(rects: list[AtlasPackerRect], strips, max_extent: int | None) -> Iterator[list[int]]:
+        for strip in strips:
+            if max_extent is None:
+                yield strip
+                continue
+
+            part = []
+            part_height = 0
+
+            for i in strip:
+                if part_height + rects[i].height > max_extent:
+                    yield part
+                    part = []
+                    part_height = 0
+
+                part.append(i)
+                part_height += rects[i].height
+
+            yield part
+
+
+class ShelfPacker(AtlasBinPacker):
+    """Next-fit decreasing height: fills shelves left to right, tallest rectangles first."""
+
+    def _create_bin(self, rects: list[AtlasPackerRect], bin_width: int) -> "_ShelfBin":
+        return _ShelfBin(bin_width, self.max_extent())
+
+    def _sort_order(self, rects: list[AtlasPackerRect], bin_width: int) -> list[int]:
+        oriented_sizes = []
+
+        for rect in rects:
+            orientations = list(self._orientations(rect, bin_width))
+            width, height, _ = orientations[0] if orientations else (rect.width, rect.height, False)
+            oriented_sizes.append((height, width))
+
+        return sorted(range(len(rects)), key=oriented_sizes.__getitem__, reverse=True)
+
+    def _orientations(self, rect: AtlasPackerRect, bin_width: int) -> Iterator[AtlasPackerOrientation]:
+        orientations = list(super()._orientations(rect, bin_width))
+
+        # Lying flat keeps the shelves low
+        orientations.sort(key=lambda orientation: orientation[1])
+
+        yield from orientations[:1]
+
+
+class _ShelfBin:
+    def __init__(self, width: int, height: int | None):
+        self.width = width
+        self.height = height
+        self.shelf_x = 0
+        self.shelf_y = 0
+        self.shelf_height = 0
+
+    def insert(self, orientations: list[AtlasPackerOrientation]) -> AtlasPackerOrientation | None:
+        width, height, rotated = orientations[0]
+        x = self.shelf_x
+        y = self.shelf_y
+        shelf_height = self.shelf_height
+
+        if x + width > self.width:
+            x = 0
+            y += shelf_height
+            shelf_height = 0
+
+        if self.height is not None and y + height > self.height:
+            return None
+
+        self.shelf_x = x + width
+        self.shelf_y = y
+        self.shelf_height = max(shelf_height, height)
+
+        return x, y, rotated
+
+
+class SkylinePacker(AtlasBinPacker):
+    """Bottom-left skyline packing."""
+
+    def _create_bin(self, rects: list[AtlasPackerRect], bin_width: int) -> "_SkylineBin":
+        return _SkylineBin(bin_width, self.max_extent())
+
+    def _sort_order(self, rects: list[AtlasPackerRect], bin_width: int) -> list[int]:
+        # tallest first keeps the skyline flat, which packs tighter and keeps the search short
+        if self.allow_rotation:
+            return sorted(
+                range(len(rects)),
+                key=lambda i: (min(rects[i].width, rects[i].height), max(rects[i].width, rects[i].height)),
+                reverse=True,
+            )
+
+        return sorted(range(len(rects)), key=lambda i: (rects[i].height, rects[i].width), reverse=True)
+
+
+class _SkylineBin:
+    def __init__(self, width: int, height: int | None):
+        self.width = width
+        self.height = height
+        self.skyline = _Skyline(width)
+
+    def insert(self, orientations: list[AtlasPackerOrientation]) -> AtlasPackerOrientation | None:
+        best = None
+
+        for width, height, rotated in orientations:
+            for segment_y, segment_x in self.skyline.lowest_segments:
+                # sorted by (y, x) and a rect never ends up lower than the segment it starts on
+                if best is not None and (segment_y + height, segment_x) >= best[0]:
+                    break
+                if self.height is not None and segment_y + height > self.height:
+                    break
+                if segment_x + width > self.width:
+                    continue
+
+                y = self.skyline.fit(segment_x, width)
+                if self.height is not None and y + height > self.height:
+                    continue
+
+                score = (y + height, segment_x)
+                if best is None or score < best[0]:
+                    best = (score, segment_x, y, width, rotated)
+
+        if best is None:
+            return None
+
+        _, x, y, width, rotated = best
+        self.skyline.add(x, best[0][0], width)
+
+        return x, y, rotated
+
+
+class _Skyline:
+    def __init__(self, width: int):
+        # start x -> (y, width); the segments cover 0..width without gaps
+        self.segments: dict[int, tuple[int, int]] = {}
+        # end x -> start x
+        self.segment_starts: dict[int, int] = {}
+        # (y, start x) of every segment, sorted
+        self.lowest_segments: list[tuple[int, int]] = []
+
+        self._insert(0, 0, width)
+
+    def fit(self, x: int, width: int) -> int:
+        y = 0
+        end = x + width
+
+        while x < end:
+            segment_y, segment_width = self.segments[x]
+            if segment_y > y:
+                y = segment_y
+            x += segment_width
+
+        return y
+
+    def add(self, x: int, y: int, width: int):
+        start = x
+        end = x + width
+        position = x
+
+        while position < end:
+            segment_y, segment_width = self._remove(position)
+            segment_end = position + segment_width
+
+            if segment_end > end:
+                self._insert(end, segment_y, segment_end - end)
+
+            position = segment_end
+
+        left_start = self.segment_starts.get(start)
+        if left_start is not None and self.segments[left_start][0] == y:
+            start = left_start
+            self._remove(left_start)
+
+        right = self.segments.get(end)
+        if right is not None and right[0] == y:
+            self._remove(end)
+            end += right[1]
+
+        self._insert(start, y, end - start)
+
+    def _insert(self, x: int, y: int, width: int):
+        self.segments[x] = (y, width)
+        self.segment_starts[x + width] = x
+        insort(self.lowest_segments, (y, x))
+
+    def _remove(self, x: int) -> tuple[int, int]:
+        y, width = self.segments.pop(x)
+        del self.segment_starts[x + width]
+        del self.lowest_segments[bisect_left(self.lowest_segments, (y, x))]
+
+        return y, width
+
+
+class MaxRectsPacker(AtlasBinPacker):
+    """MaxRects with the bottom-left rule. Packs tightest, but is the slowest packer.
+
+    Every insert searches and splits the whole free rect list, so packing time grows quadratically.
+    More than max_rects rectangles (about a second of packing) are packed with SkylinePacker instead.
+    """
+    max_rects = 1000
+
+    def pack(self, rects: list[AtlasPackerRect]) -> list[AtlasPackerPlacement]:
+        if len(rects) > self.max_rects:
+            warnings.warn(f"maxrects packs at most {self.max_rects} textures, {len(rects)} are packed with skyline")
+            skyline_packer = SkylinePacker(
+                allow_rotation=self.allow_rotation,
+                power_of_two=self.power_of_two,
+                max_size=self.max_size,
+                padding=self.padding,
+            )
+
+            return skyline_packer.pack(rects)
+
+        return super().pack(rects)
+
+    def _create_bin(self, rects: list[AtlasPackerRect], bin_width: int) -> "_MaxRectsBin":
+        bin_height = self.max_extent()
+        if bin_height is None:
+            bin_height = sum(max(rect.width, rect.height) for rect in rects)
+
+        return _MaxRectsBin(bin_width, bin_height)
+
+
+class _MaxRectsBin:
+    def __init__(self, width: int, height: int):
+        self.free_rects = [(0, 0, width, height)]
+
+    def insert(self, orientations: list[AtlasPackerOrientation]) -> AtlasPackerOrientation | None:
+        best = None
+
+        for width, height, rotated in orientations:
+            for free_x, free_y, free_width, free_height in self.free_rects:
+                if width > free_width or height > free_height:
+                    continue
+
+                score = (free_y + height, free_x)
+                if best is None or score < best[0]:
+                    best = (score, free_x, free_y, width, height, rotated)
+
+        if best is None:
+            return None
+
+        _, x, y, width, height, rotated = best
+        self.free_rects = self._split_free_rects(self.free_rects, x, y, width, height)
+
+        return x, y, rotated
+
+    @staticmethod
+    def _split_free_rects(
+        free_rects: list[tuple[int, int, int, int]],
+        x: int,
+        y: int,
+        width: int,
+        height: int,
+    ) -> list[tuple[int, int, int, int]]:
+        right = x + width
+        bottom = y + height
+        untouched_rects = []
+        split_rects = []
+
+        for free_rect in free_rects:
+            free_x, free_y, free_width, free_height = free_rect
+            free_right = free_x + free_width
+            free_bottom = free_y + free_height
+
+            if x >= free_right or right <= free_x or y >= free_bottom or bottom <= free_y:
+                untouched_rects.append(free_rect)
+                continue
+
+            if x > free_x:
+                split_rects.append((free_x, free_y, x - free_x, free_height))
+            if right < free_right:
+                split_rects.append((right, free_y, free_right - right, free_height))
+            if y > free_y:
+                split_rects.append((free_x, free_y, free_width, y - free_y))
+            if bottom < free_bottom:
+                split_rects.append((free_x, bottom, free_width, free_bottom - bottom))
+
+        # The untouched rects never contain each other, so only pairs with a new split rect need checking
+        split_rects = [
+            split_rect for split_rect in set(split_rects)
+            if not any(_contains(untouched_rect, split_rect) for untouched_rect in untouched_rects)
+        ]
+        split_rects = [
+            split_rect for split_rect in split_rects
+            if not any(other != split_rect and _contains(other, split_rect) for other in split_rects)
+        ]
+
+        return untouched_rects + split_rects
+
+
+def _contains(outer: tuple[int, int, int, int], inner: tuple[int, int, int, int]) -> bool:
+    return (
+        outer[0] <= inner[0]
+        and outer[1] <= inner[1]
+        and inner[0] + inner[2] <= outer[0] + outer[2]
+        and inner[1] + inner[3] <= outer[1] + outer[3]
+    )
+
+
+def next_power_of_two(value: int) -> int:
+    if value <= 1:
+        return 1
+
+    return 1 << (value - 1).bit_length()
+
+
+PACKERS: dict[str, type[AtlasPacker]] = {
+    "grid": GridPacker,
+    "shelf": ShelfPacker,
+    "skyline": SkylinePacker,
+    "maxrects": MaxRectsPacker,
+}
+
+
+def get_packer(
+    name: str,
+    allow_rotation: bool = False,
+    power_of_two: bool = False,
+    max_size: int | None = None,
+    padding: int = 0,
+) -> AtlasPacker:
+    try:
+        packer_class = PACKERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown atlas packer '{name}'")
+
+    return packer_class(allow_rotation=allow_rotation, power_of_two=power_of_two, max_size=max_size, padding=padding)
@@ -1,9 +1,57 @@
 from typing import Literal, Optional
-from pydantic import BaseModel, BaseSettings, Field
+from pydantic import BaseModel, BaseSettings, Field, conint, validator
+
+from atlas_texture_creator.packers import PACKERS
+
+
+class AtlasManagerConfigDBPragmas(BaseModel):
+    journal_mode: Literal["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"] | None = None
+    synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] | None = None
+    # bytes of the database file sqlite maps into memory
+    mmap_size: conint(ge=0) | None = None
+    # pages if positive, KiB if negative
+    cache_size: int | None = None
+    temp_store: Literal["DEFAULT", "FILE", "MEMORY"] | None = None
+    # only changes new databases, INCREMENTAL lets delete_collection(vacuum=True) shrink the file
+    auto_vacuum: Literal["NONE", "FULL", "INCREMENTAL"] | None = None
+
+
+# WAL lets readers and a writer work at the same time, NORMAL only syncs at checkpoints
+SQLITE_PRAGMA_PROFILES: dict[str, AtlasManagerConfigDBPragmas] = {
+    "default": AtlasManagerConfigDBPragmas(),
+    "performance": AtlasManagerConfigDBPragmas(
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        mmap_size=256 * 1024 * 1024,
+        cache_size=-64 * 1024,
+        temp_store="MEMORY",
+    ),
+}
 
 
 class AtlasManagerConfigDB(BaseSettings):
     sqlite_path: str = Field("atlas_manager.db")
+    profile: Literal["default", "performance"] = "default"
+    # overrides single pragmas of the profile
+    pragmas: AtlasManagerConfigDBPragmas | None = None
+    # connection pool of the engine, None keeps the SQLAlchemy default
+    pool_size: conint(ge=1) | None = None
+    max_overflow: int | None = None
+    pool_timeout: float | None = None
+    pool_recycle: int | None = None
+    pool_pre_ping: bool | None = None
+
+    @staticmethod
+    def pool_option_names() -> set[str]:
+        return {"pool_size", "max_overflow", "pool_timeout", "pool_recycle", "pool_pre_ping"}
+
+    def sqlite_pragmas(self) -> dict[str, str | int]:
+        pragmas = SQLITE_PRAGMA_PROFILES[self.profile].dict(exclude_none=True)
+
+        if self.pragmas is not None:
+            pragmas.update(self.pragmas.dict(exclude_none=True))
+
+        return pragmas
 
 
 class AtlasManagerConfig(BaseModel):
@@ -11,6 +59,7 @@ class AtlasManagerConfig(BaseModel):
 
 
 AtlasGridDirection = Literal["row", "column"]
+PathValidation = Literal["strict", "lazy"]
 
 
 Column = int
@@ -29,6 +78,24 @@ class GenerateAtlasOptionsSize(BaseModel):
 
 class GenerateAtlasOptions(BaseModel):
     lock_size: GenerateAtlasOptionsSize | None
+    workers: conint(ge=1) = 1
+    packer: str = "grid"
+    allow_rotation: bool = False
+    padding: conint(ge=0) = 0
+    extrude: conint(ge=0) = 0
+    power_of_two: bool = False
+    # Splits the atlas into pages of at most max_size x max_size
+    max_size: conint(ge=1) | None = None
+    premultiply_alpha: bool = False
+    # "numpy" needs the optional numpy dependency, the output is the same
+    backend: Literal["pillow", "numpy"] = "pillow"
+
+    @validator("packer")
+    def packer_exists(cls, packer: str) -> str:
+        if packer not in PACKERS:
+            raise ValueError(f"unknown packer, use one of: {', '.join(PACKERS)}")
+
+        return packer
 
 
 class GenerateAtlasCoordTexture(BaseModel):
@@ -36,6 +103,9 @@ class GenerateAtlasCoordTexture(BaseModel):
     y: int
     width: int
     height: int
+    # The texture is stored rotated 90 degrees clockwise, width and height are the rotated size
+    rotated: bool = False
+    page: int = 0
 
 
 GenerateAtlasReturnType = dict[str, GenerateAtlasCoordTexture]
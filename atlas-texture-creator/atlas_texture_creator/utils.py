@@ -0,0 +1,33 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Iterable, Iterator, TypeVar
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def imap_ordered(function: Callable[[T], R], items: Iterable[T], workers: int = 1) -> Iterator[R]:
+    """Like map(), but runs function in a thread pool and still yields the results in input order.
+
+    At most 2 * workers results are in flight at once, so a slow consumer never
+    causes every item to be held in memory.
+    """
+    if workers <= 1:
+        yield from map(function, items)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending: deque[Future[R]] = deque()
+
+    try:
+        for item in items:
+            pending.append(executor.submit(function, item))
+
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(cancel_futures=True)
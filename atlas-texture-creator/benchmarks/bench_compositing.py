@@ -0,0 +1,61 @@
+"""Compares the Pillow and the NumPy compositing backend of generate_atlas.
+
+    PYTHONPATH=. python benchmarks/bench_compositing.py --textures 2000 --repeat 3
+
+Needs the numpy extra: pip install "atlas-texture-creator[numpy]"
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from atlas_texture_creator import AtlasCollection
+from atlas_texture_creator.types import GenerateAtlasOptions
+from synthetic import create_collection, create_textures
+
+
+def time_generate_atlas(atlas_collection: AtlasCollection, options: GenerateAtlasOptions, repeat: int) -> float:
+    best = float("inf")
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        atlas_collection.generate_atlas(options)
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--textures", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--packer", default="maxrects")
+    parser.add_argument("--extrude", type=int, default=2)
+    parser.add_argument("--premultiply-alpha", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as texture_dir:
+        atlas_collection = create_collection(create_textures(Path(texture_dir), args.textures, min_size=8, max_size=64))
+        options = GenerateAtlasOptions(
+            packer=args.packer,
+            padding=1,
+            extrude=args.extrude,
+            premultiply_alpha=args.premultiply_alpha,
+        )
+        # the layout and the header probes are cached after the first run, time only the compositing
+        atlas_collection.generate_atlas_layout(options)
+
+        results = {}
+        for backend in ("pillow", "numpy"):
+            results[backend] = time_generate_atlas(
+                atlas_collection,
+                options.copy(update={"backend": backend}),
+                args.repeat,
+            )
+            print(f"{backend:>6}: {results[backend]:.3f}s")
+
+        print(f"numpy speedup: {results['pillow'] / results['numpy']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
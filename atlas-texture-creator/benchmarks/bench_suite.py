@@ -0,0 +1,280 @@
+"""Times atlas generation and collection operations on synthetic collections and records their peak RSS.
+
+    PYTHONPATH=. python benchmarks/bench_suite.py --sizes 100 1000 --output results.json
+    PYTHONPATH=. python benchmarks/bench_suite.py --sizes 100 1000 --compare results.json
+
+Every measurement runs in a fresh process, so the peak RSS of one benchmark never hides the next one.
+texture_store also reports the memory the loaded store keeps, measured with tracemalloc in a second run.
+The textures are generated once into --texture-dir (a temporary directory by default) and reused.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+from sqlmodel import Session
+
+from atlas_texture_creator import AtlasManager, AtlasManagerConfig, AtlasManagerConfigDB, numpy_backend
+from atlas_texture_creator.atlas_collection import AtlasCollectionTextureStore, AtlasGrid
+from atlas_texture_creator.db.models import Collection, Texture
+from atlas_texture_creator.packers import AtlasPackerRect, get_packer
+from atlas_texture_creator.types import GenerateAtlasOptions
+from synthetic import create_collection, create_textures
+
+
+DEFAULT_SIZES = [100, 1000, 10000, 50000]
+
+
+def peak_rss() -> int:
+    """Peak resident set size of this process in bytes."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # kilobytes on Linux, bytes on macOS
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def create_atlas_manager(work_dir: Path) -> AtlasManager:
+    return AtlasManager(AtlasManagerConfig(
+        db=AtlasManagerConfigDB(sqlite_path=str(work_dir / "atlas_manager.db")),
+    ))
+
+
+def setup_grid_add(texture_dir: Path, work_dir: Path, count: int) -> Callable:
+    grid = AtlasGrid(direction="row")
+
+    def run():
+        for _ in range(count):
+            grid.add()
+
+    return run
+
+
+def setup_grid_allocate(texture_dir: Path, work_dir: Path, count: int) -> Callable:
+    grid = AtlasGrid(direction="row")
+
+    return lambda: grid.allocate(count)
+
+
+def setup_pack_pages(texture_dir: Path, work_dir: Path, count: int) -> Callable:
+    rnd = random.Random(count)
+    rects = [
+        AtlasPackerRect(width=rnd.randint(8, 64), height=rnd.randint(8, 64), row=i, column=0)
+        for i in range(count)
+    ]
+    packer = get_packer("skyline", allow_rotation=True, max_size=1024)
+
+    return lambda: packer.pack(rects)
+
+
+def setup_texture_store(texture_dir: Path, work_dir: Path, count: int) -> Callable:
+    grid = AtlasGrid(direction="row")
+    rows = [(str(texture_dir / f"{i % 100}.png"), f"texture {i}", *grid.coord_of(i)) for i in range(count)]
+    texture_stores = []
+
+    def run():
+        # kept alive, so the RSS growth is what the loaded store holds on to
+        texture_stores.append(AtlasCollectionTextureStore())
+        texture_stores[-1].load_rows(rows)
+
+    return run
+
+
+def setup_add_texture(texture_dir: Path, work_dir: Path, count: int) -> Callable:
+    texture_models = create_textures(texture_dir, count)
+
+    return lambda: create_collection(texture_models)
+
+
+def setup_generate_atlas(texture_dir: Path, work_dir: Path, count: int) -> Callable:
+    atlas_collection = create_collection(create_textures(texture_dir, count))
+    options = GenerateAtlasOptions(workers=os.cpu_count() or 1)
+
+    return lambda: atlas_collection.generate_atlas(options)
+
+
+def setup_json_export(texture_dir: Path, work_dir: Path, count: int) -> Callable:
+    atlas_collection = create_collection(create_textures(texture_dir, count))
+    textures_coord = atlas_collection.generate_atlas_layout().textures_coord
+
+    return textures_coord.json
+
+
+def setup_manager_add_texture(texture_dir: Path, work_dir: Path, count: int) -> Callable:
+    atlas_collection = create_collection(create_textures(texture_dir, count))
+    atlas_manager = create_atlas_manager(work_dir)
+    atlas_manager.create_collection(atlas_collection.name)
+
+    def run():
+        for texture in atlas_collection:
+            atlas_manager.add_texture(atlas_collection.name, texture)
+
+    return run
+
+
+def setup_manager_add_textures(texture_dir: Path, work_dir: Path, count: int) -> Callable:
+    atlas_collection = create_collection(create_textures(texture_dir, count))
+    atlas_manager = create_atlas_manager(work_dir)
+    atlas_manager.create_collection(atlas_collection.name)
+
+    return lambda: atlas_manager.add_textures(atlas_collection.name, atlas_collection)
+
+
+def setup_manager_load_collection(texture_dir: Path, work_dir: Path, count: int) -> Callable:
+    atlas_collection = create_collection(create_textures(texture_dir, count))
+    atlas_manager = create_atlas_manager(work_dir)
+
+    # filled in one transaction, only loading is measured
+    with Session(atlas_manager.db_engine) as session:
+        collection_model = Collection(name=atlas_collection.name)
+        session.add(collection_model)
+        session.flush()
+        session.add_all(
+            Texture(
+                collection_id=collection_model.id,
+                path=str(texture.path),
+                label=texture.label,
+                row=texture.row,
+                column=texture.column,
+            )
+            for texture in atlas_collection
+        )
+        session.commit()
+
+    return lambda: atlas_manager.load_collection(atlas_collection.name)
+
+
+def setup_manager_delete_collection(texture_dir: Path, work_dir: Path, count: int) -> Callable:
+    atlas_collection = create_collection(create_textures(texture_dir, count))
+    atlas_manager = create_atlas_manager(work_dir)
+    atlas_manager.create_collection(atlas_collection.name)
+    atlas_manager.add_textures(atlas_collection.name, atlas_collection)
+
+    return lambda: atlas_manager.delete_collection(atlas_collection.name)
+
+
+BENCHMARKS: dict[str, Callable[[Path, Path, int], Callable]] = {
+    "grid_add": setup_grid_add,
+    "grid_allocate": setup_grid_allocate,
+    "pack_pages": setup_pack_pages,
+    "texture_store": setup_texture_store,
+    "add_texture": setup_add_texture,
+    "generate_atlas": setup_generate_atlas,
+    "json_export": setup_json_export,
+    "manager_add_texture": setup_manager_add_texture,
+    "manager_add_textures": setup_manager_add_textures,
+    "manager_load_collection": setup_manager_load_collection,
+    "manager_delete_collection": setup_manager_delete_collection,
+}
+
+# run only when numpy is installed
+NUMPY_BENCHMARKS = {"grid_allocate"}
+# run a second time under tracemalloc, which records the memory the run keeps allocated
+TRACED_BENCHMARKS = {"texture_store"}
+
+
+def available_benchmarks() -> list[str]:
+    return [
+        name for name in BENCHMARKS
+        if name not in NUMPY_BENCHMARKS or numpy_backend.numpy_available()
+    ]
+
+
+def run_benchmark(name: str, count: int, texture_dir: Path) -> dict:
+    with tempfile.TemporaryDirectory() as work_dir:
+        run = BENCHMARKS[name](texture_dir, Path(work_dir), count)
+        rss_before = peak_rss()
+
+        start = time.perf_counter()
+        run()
+        seconds = time.perf_counter() - start
+        rss = peak_rss()
+
+        traced = None
+        if name in TRACED_BENCHMARKS:
+            tracemalloc.start()
+            run()
+            traced, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        return {
+            "benchmark": name,
+            "textures": count,
+            "seconds": seconds,
+            "peak_rss": rss,
+            "peak_rss_growth": rss - rss_before,
+            "traced": traced,
+        }
+
+
+def run_isolated(name: str, count: int, texture_dir: Path) -> dict:
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(run_benchmark, name, count, texture_dir).result()
+
+
+def format_result(result: dict, previous: dict | None) -> str:
+    mib = 1024 * 1024
+    line = (
+        f"{result['benchmark']:<26} {result['textures']:>7} "
+        f"{result['seconds']:>10.3f}s {result['peak_rss'] / mib:>9.1f} MiB {result['peak_rss_growth'] / mib:>+9.1f} MiB"
+    )
+
+    if result.get("traced") is not None:
+        line += f"  {result['traced'] / mib:.1f} MiB kept ({result['traced'] / result['textures']:.0f} B per texture)"
+
+    if previous is not None:
+        line += f"  {result['seconds'] / max(previous['seconds'], 1e-9):>6.2f}x time"
+
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=available_benchmarks())
+    parser.add_argument("--texture-dir", type=Path, help="keeps the generated textures between runs")
+    parser.add_argument("--output", type=Path, help="writes the results as JSON")
+    parser.add_argument("--compare", type=Path, help="JSON results of an earlier run to compare the times with")
+    args = parser.parse_args()
+
+    unavailable = [name for name in args.benchmarks if name not in available_benchmarks()]
+    if unavailable:
+        parser.error(
+            f"numpy is needed for {', '.join(unavailable)}, install it with: pip install \"atlas-texture-creator[numpy]\""
+        )
+
+    previous_results = {}
+    if args.compare is not None:
+        previous_results = {
+            (result["benchmark"], result["textures"]): result
+            for result in json.loads(args.compare.read_text())
+        }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        texture_dir = args.texture_dir or Path(tmp_dir)
+        texture_dir.mkdir(parents=True, exist_ok=True)
+        create_textures(texture_dir, max(args.sizes))
+
+        results = []
+        print(f"{'benchmark':<26} {'textures':>7} {'time':>11} {'peak RSS':>13} {'RSS growth':>13}")
+
+        for count in args.sizes:
+            for name in args.benchmarks:
+                result = run_isolated(name, count, texture_dir)
+                results.append(result)
+                print(format_result(result, previous_results.get((name, count))), flush=True)
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
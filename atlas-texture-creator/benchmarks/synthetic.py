@@ -0,0 +1,39 @@
+import random
+from pathlib import Path
+
+from PIL import Image
+
+from atlas_texture_creator import AtlasCollection, AtlasTextureModel
+
+
+def create_textures(
+    texture_dir: Path,
+    count: int,
+    min_size: int = 4,
+    max_size: int = 32,
+    seed: int = 0,
+) -> list[AtlasTextureModel]:
+    """Saves count PNG textures of random size and color to texture_dir, files which already exist are reused."""
+    rnd = random.Random(seed)
+    texture_models = []
+
+    for i in range(count):
+        file_path = texture_dir / f"{i}.png"
+        size = (rnd.randint(min_size, max_size), rnd.randint(min_size, max_size))
+        color = (rnd.randrange(256), rnd.randrange(256), rnd.randrange(256), rnd.randrange(256))
+
+        if not file_path.exists():
+            Image.new("RGBA", size, color).save(file_path)
+
+        texture_models.append(AtlasTextureModel(path=file_path, label=f"texture_{i}"))
+
+    return texture_models
+
+
+def create_collection(texture_models: list[AtlasTextureModel], name: str = "benchmark") -> AtlasCollection:
+    atlas_collection = AtlasCollection(name)
+
+    for texture_model in texture_models:
+        atlas_collection.add_texture(texture_model)
+
+    return atlas_collection
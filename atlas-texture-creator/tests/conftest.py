@@ -1,6 +1,9 @@
 import os
+import random
 from pathlib import Path
+from typing import Iterable
 import pytest
+from PIL import Image
 
 from atlas_texture_creator import AtlasTexture, AtlasCollection, AtlasTextureModel, AtlasManager, AtlasManagerConfig, \
     AtlasManagerConfigDB
@@ -23,6 +26,37 @@ def create_atlas_texture_model() -> AtlasTextureModel:
     )
 
 
+def create_image_collection(directory: Path, images: Iterable[Image.Image]) -> AtlasCollection:
+    """A collection with one texture per image, saved as directory/<i>.png and labeled i."""
+    atlas_collection = AtlasCollection("test")
+
+    for i, img in enumerate(images):
+        file_path = directory / f"{i}.png"
+        img.save(file_path)
+        atlas_collection.add_texture(AtlasTextureModel(path=file_path, label=str(i)))
+
+    return atlas_collection
+
+
+def create_solid_images(sizes: Iterable[tuple[int, int]], color: str = "red") -> list[Image.Image]:
+    return [Image.new("RGBA", size, color) for size in sizes]
+
+
+def create_random_images(count: int, max_size: int) -> list[Image.Image]:
+    rnd = random.Random(count)
+    images = []
+
+    for _ in range(count):
+        img = Image.new("RGBA", (rnd.randint(1, max_size), rnd.randint(1, max_size)))
+        img.putdata([
+            (rnd.randrange(256), rnd.randrange(256), rnd.randrange(256), rnd.randrange(256))
+            for _ in range(img.width * img.height)
+        ])
+        images.append(img)
+
+    return images
+
+
 def create_atlas_manager_config() -> AtlasManagerConfig:
     return AtlasManagerConfig(
         db=AtlasManagerConfigDB(sqlite_path=sqlite_file_path)
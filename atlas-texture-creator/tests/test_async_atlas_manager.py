@@ -0,0 +1,37 @@
+import asyncio
+
+from atlas_texture_creator import AsyncAtlasManager, AtlasManager, AtlasTexture
+from tests.conftest import test_image_file_path
+
+
+def test_async_atlas_manager(atlas_manager_with_config: AtlasManager):
+    async def run():
+        async_atlas_manager = AsyncAtlasManager(atlas_manager=atlas_manager_with_config)
+        progress = []
+
+        await async_atlas_manager.create_collection("test")
+        inserted = await async_atlas_manager.add_textures(
+            "test",
+            [AtlasTexture(path=test_image_file_path, label=str(i), row=0, column=i) for i in range(5)],
+            chunk_size=2,
+            on_progress=progress.append,
+        )
+
+        collections, atlas_collection = await asyncio.gather(
+            async_atlas_manager.list_collections(),
+            async_atlas_manager.load_collection("test"),
+        )
+        atlas_image, texture_coords = await async_atlas_manager.generate_atlas(atlas_collection)
+
+        await async_atlas_manager.close()
+
+        return inserted, progress, collections, atlas_collection, atlas_image, texture_coords
+
+    inserted, progress, collections, atlas_collection, atlas_image, texture_coords = asyncio.run(run())
+
+    assert inserted == 5
+    assert progress == [2, 4, 5]
+    assert collections == ["test"]
+    assert len(atlas_collection) == 5
+    assert atlas_image.tobytes() == atlas_collection.generate_atlas()[0].tobytes()
+    assert texture_coords.json() == atlas_collection.generate_atlas()[1].json()
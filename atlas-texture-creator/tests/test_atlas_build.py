@@ -0,0 +1,67 @@
+from pathlib import Path
+
+from PIL import Image
+
+from atlas_texture_creator import AtlasTextureModel
+from atlas_texture_creator.atlas_build import AtlasBuildState, atlas_build_state_path
+from atlas_texture_creator.types import GenerateAtlasOptions
+from tests.conftest import create_image_collection
+
+
+def test_build_atlas_patches_changed_textures(tmp_path: Path):
+    atlas_file_path = tmp_path / "atlas.png"
+    atlas_collection = create_image_collection(tmp_path, [
+        Image.new("RGBA", (8, 8), color) for color in ("red", "green", "blue", "white", "black")
+    ])
+    options = GenerateAtlasOptions(packer="shelf", extrude=1)
+
+    file_paths, texture_coords, patched_labels = atlas_collection.build_atlas(atlas_file_path, options)
+
+    assert file_paths == [atlas_file_path]
+    assert patched_labels is None
+    assert atlas_build_state_path(atlas_file_path).exists()
+
+    _, _, patched_labels = atlas_collection.build_atlas(atlas_file_path, options)
+    assert patched_labels == []
+
+    changed_file_path = tmp_path / "changed.png"
+    Image.new("RGBA", (8, 8), "yellow").save(changed_file_path)
+    label = atlas_collection.get_texture(row=0, column=1).label
+    atlas_collection.update_texture(0, 1, AtlasTextureModel(path=changed_file_path, label=label))
+
+    _, texture_coords, patched_labels = atlas_collection.build_atlas(atlas_file_path, options)
+    assert patched_labels == [label]
+
+    atlas_image, expected_texture_coords = atlas_collection.generate_atlas(options)
+    with Image.open(atlas_file_path) as img:
+        assert img.convert("RGBA").tobytes() == atlas_image.tobytes()
+    assert texture_coords.json() == expected_texture_coords.json()
+
+
+def test_build_atlas_rebuilds_on_layout_change(tmp_path: Path):
+    atlas_file_path = tmp_path / "atlas.png"
+    atlas_collection = create_image_collection(tmp_path, [
+        Image.new("RGBA", (8, 8), color) for color in ("red", "green")
+    ])
+
+    atlas_collection.build_atlas(atlas_file_path)
+    atlas_collection.add_texture(AtlasTextureModel(path=tmp_path / "0.png", label="2"))
+    _, _, patched_labels = atlas_collection.build_atlas(atlas_file_path)
+    assert patched_labels is None
+
+    _, _, patched_labels = atlas_collection.build_atlas(atlas_file_path, GenerateAtlasOptions(padding=2))
+    assert patched_labels is None
+
+    _, _, patched_labels = atlas_collection.build_atlas(atlas_file_path, GenerateAtlasOptions(padding=2, workers=4))
+    assert patched_labels == []
+
+    _, _, patched_labels = atlas_collection.build_atlas(atlas_file_path, incremental=False)
+    assert patched_labels is None
+
+
+def test_atlas_build_state_load_invalid(tmp_path: Path):
+    file_path = tmp_path / "atlas.png.build.json"
+    assert AtlasBuildState.load(file_path) is None
+
+    file_path.write_text("{")
+    assert AtlasBuildState.load(file_path) is None
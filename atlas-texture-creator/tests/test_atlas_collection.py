@@ -1,10 +1,11 @@
+import tracemalloc
 from pathlib import Path
 
 import pytest
 from PIL.Image import Image
 
 from atlas_texture_creator import AtlasCollection, AtlasTexture, AtlasTextureModel
-from atlas_texture_creator.atlas_collection import GenerateAtlasTextureCoords
+from atlas_texture_creator.atlas_collection import AtlasCollectionTextureStore, AtlasGrid, GenerateAtlasTextureCoords
 from atlas_texture_creator.types import AtlasGridItem, GenerateAtlasOptions, GenerateAtlasCoordTexture, \
     GenerateAtlasOptionsSize
 
@@ -15,6 +16,7 @@ def _mock_data_dir() -> Path:
 
 mock_dir = _mock_data_dir()
 test_image_file_path = mock_dir / "white.png"
+test_image_file_path2 = mock_dir / "black.png"
 
 
 def test_create_atlas_collection():
@@ -232,3 +234,187 @@ def test_generate_atlas_with_options(atlas_collection: AtlasCollection, atlas_te
         assert isinstance(atlas_texture_coord, GenerateAtlasCoordTexture)
         assert atlas_texture_coord.width == atlas_option_size_width
         assert atlas_texture_coord.height == atlas_option_size_height
+
+
+def test_generate_atlas_layout(atlas_collection: AtlasCollection, atlas_texture_model: AtlasTextureModel):
+    textures_count = 5
+
+    for i in range(textures_count):
+        atlas_texture_model_tmp = atlas_texture_model.copy()
+        atlas_texture_model_tmp.label = f"{atlas_texture_model.label} {i}"
+        atlas_collection.add_texture(atlas_texture_model_tmp)
+
+    layout = atlas_collection.generate_atlas_layout()
+    atlas_image, texture_coords = atlas_collection.generate_atlas()
+
+    assert len(layout) == textures_count
+    assert layout.size == atlas_image.size
+    assert layout.textures_coord.json() == texture_coords.json()
+
+
+def test_generate_atlas_with_workers(atlas_collection: AtlasCollection):
+    for i in range(10):
+        atlas_collection.add_texture(AtlasTextureModel(
+            path=test_image_file_path if i % 2 == 0 else test_image_file_path2,
+            label=f"texture {i}",
+        ))
+
+    atlas_options_size = GenerateAtlasOptionsSize(width=20, height=40)
+    atlas_image, texture_coords = atlas_collection.generate_atlas(GenerateAtlasOptions(lock_size=atlas_options_size))
+    atlas_image2, texture_coords2 = atlas_collection.generate_atlas(GenerateAtlasOptions(
+        lock_size=atlas_options_size,
+        workers=4,
+    ))
+
+    assert atlas_image.tobytes() == atlas_image2.tobytes()
+    assert texture_coords.json() == texture_coords2.json()
+
+
+@pytest.mark.parametrize("direction", ["row", "column"])
+def test_atlas_grid_set_length(direction: str):
+    grid = AtlasGrid(direction=direction)
+
+    for length in range(200):
+        grid_with_length = AtlasGrid(direction=direction)
+        grid_with_length.set_length(length)
+
+        assert vars(grid_with_length) == vars(grid)
+        grid.add()
+
+
+def test_texture_store_interns_paths_and_labels():
+    texture_store = AtlasCollectionTextureStore()
+
+    for i in range(6):
+        texture_store.add(AtlasTexture(path=test_image_file_path if i % 2 == 0 else test_image_file_path2, label="a"))
+
+    assert len(texture_store) == 6
+    assert len(texture_store._paths) == 2
+    assert len(texture_store._labels) == 1
+    assert [texture.row for texture in texture_store.column(1)] == [0, 1]
+    assert [texture.column for texture in texture_store.row(0)] == [0, 1, 2]
+    assert texture_store.get(row=1, column=1).path == test_image_file_path2
+
+
+def test_texture_store_loads_rows():
+    texture_store = AtlasCollectionTextureStore()
+    grid = AtlasGrid(direction="row")
+    texture_store.load_rows([
+        (str(test_image_file_path if i % 2 == 0 else test_image_file_path2), f"texture {i % 3}", *grid.coord_of(i))
+        for i in range(6)
+    ])
+
+    assert len(texture_store._paths) == 2
+    assert texture_store.get(row=1, column=1) == AtlasTexture(path=test_image_file_path2, label="texture 0", row=1, column=1)
+    assert texture_store.get(row=0, column=0).path is texture_store.get(row=2, column=0).path
+    assert [texture.label for texture in texture_store.find_by_label("texture 1")] == ["texture 1", "texture 1"]
+    row, column = grid.coord_of(6)
+    assert texture_store.add(AtlasTexture(path=test_image_file_path, label="next")) == AtlasGridItem(row=row, column=column)
+
+    for coord in ((0, 1), (2, 0)):
+        texture_store = AtlasCollectionTextureStore()
+
+        with pytest.raises(ValueError):
+            texture_store.load_rows([(str(test_image_file_path), "first", 0, 0), (str(test_image_file_path), "off", *coord)])
+
+        assert len(texture_store) == 0
+        assert len(texture_store.grid) == 0
+
+
+def test_texture_store_memory_per_texture():
+    count = 20000
+    grid = AtlasGrid(direction="row")
+    rows = [(f"textures/{i % 100}.png", f"texture {i}", *grid.coord_of(i)) for i in range(count)]
+
+    tracemalloc.start()
+    try:
+        texture_store = AtlasCollectionTextureStore()
+        texture_store.load_rows(rows)
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(texture_store) == count
+    # the labels and paths themselves are not counted, they are shared with the rows
+    assert size / count < 130
+
+
+def test_texture_store_views_are_copies():
+    texture_store = AtlasCollectionTextureStore()
+    texture_store.add(AtlasTexture(path=test_image_file_path, label="a"))
+
+    texture = texture_store.get(0, 0)
+    texture.label = "b"
+    assert texture_store.get(0, 0).label == "a"
+
+    texture_store.replace(AtlasTextureModel(path=test_image_file_path2, label="b"), row=0, column=0)
+    assert texture_store.get(0, 0) == AtlasTexture(path=test_image_file_path2, label="b", row=0, column=0)
+
+
+def test_find_textures_by_label_and_path():
+    atlas_collection = AtlasCollection("test")
+
+    for i in range(5):
+        atlas_collection.add_texture(AtlasTextureModel(
+            path=test_image_file_path if i < 3 else test_image_file_path2,
+            label=f"texture {i % 4}",
+        ))
+
+    assert atlas_collection.find_by_label("texture 0").get_coord() == AtlasGridItem(row=0, column=0)
+    assert atlas_collection.find_by_label("unknown") is None
+    assert atlas_collection.path_refcount(test_image_file_path) == 3
+    assert atlas_collection.path_refcount(str(test_image_file_path2)) == 2
+    assert atlas_collection.path_refcount("unknown.png") == 0
+
+    texture = atlas_collection.find_by_path(test_image_file_path)[0]
+    atlas_collection.update_texture(
+        row=texture.row,
+        column=texture.column,
+        new_texture_model=AtlasTextureModel(path=test_image_file_path2, label="replaced"),
+    )
+
+    assert atlas_collection.path_refcount(test_image_file_path) == 2
+    assert [t.label for t in atlas_collection.find_by_path(test_image_file_path2)] == ["replaced", "texture 3", "texture 0"]
+    assert atlas_collection.find_by_label("texture 0").label == "texture 0"
+    assert atlas_collection.find_by_label("replaced") == atlas_collection.get_texture(texture.row, texture.column)
+
+    texture = atlas_collection.find_by_label("texture 1")
+    atlas_collection.update_texture(texture.row, texture.column, AtlasTextureModel(path=texture.path, label="texture 2"))
+
+    assert atlas_collection.find_by_label("texture 1") is None
+    assert len(atlas_collection.textures.find_by_label("texture 2")) == 2
+
+    atlas_collection.update_texture(texture.row, texture.column, AtlasTextureModel(path=texture.path, label="texture 1"))
+
+    assert atlas_collection.find_by_label("texture 1") == texture
+    assert len(atlas_collection.textures.find_by_label("texture 2")) == 1
+
+
+@pytest.mark.parametrize("direction", ["row", "column"])
+def test_atlas_grid_coord_of(direction: str):
+    grid = AtlasGrid(direction=direction)
+
+    for index in range(200):
+        grid_item = grid.add()
+
+        assert grid.coord_of(index) == (grid_item.row, grid_item.column)
+        assert grid.index_of(row=grid_item.row, column=grid_item.column) == index
+
+
+def test_texture_store_iterates_rows_and_columns():
+    texture_store = AtlasCollectionTextureStore()
+
+    for i in range(7):
+        texture_store.add(AtlasTexture(path=test_image_file_path, label=str(i)))
+
+    # row direction, by column: [[0, 1, 4], [2, 3, 6], [5]]
+    assert texture_store.occupancy() == [3, 3, 1]
+    assert [texture.label for texture in texture_store.iter_columns()] == ["0", "1", "4", "2", "3", "6", "5"]
+    assert [texture.label for texture in texture_store.iter_rows()] == ["0", "2", "5", "1", "3", "4", "6"]
+    assert [texture.label for texture in texture_store.row(1)] == ["1", "3"]
+    assert texture_store.has(row=0, column=2)
+    assert not texture_store.has(row=1, column=2)
+    assert not texture_store.has(row=0, column=3)
+
+    with pytest.raises(IndexError):
+        texture_store.row(3)
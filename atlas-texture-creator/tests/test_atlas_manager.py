@@ -2,12 +2,16 @@ import os
 from pathlib import Path
 from typing import Callable
 
+import sqlite3
+
 import pydantic
 import pytest
+import sqlalchemy
 from decorator import decorator
 
-from atlas_texture_creator import AtlasManager, AtlasManagerConfig, AtlasCollection, AtlasTexture
-from tests.conftest import sqlite_file_path, test_image_file_path, test_image_file_path2
+from atlas_texture_creator import AtlasManager, AtlasManagerConfig, AtlasManagerConfigDB, AtlasCollection, AtlasTexture, \
+    AtlasTextureModel, AtlasManagerConfigDBPragmas
+from tests.conftest import sqlite_file_path, test_image_file_path, test_image_file_path2, delete_file
 
 
 def delete_file_after_done(file_path: str):
@@ -95,6 +99,48 @@ def test_delete_collection(atlas_manager_with_config: AtlasManager):
     assert atlas_manager_with_config.load_collection(COLLECTION_NAME) is None
 
 
+def test_delete_collection_keeps_other_collections(atlas_manager_with_config: AtlasManager):
+    for collection_name in ["test", "other"]:
+        atlas_manager_with_config.create_collection(collection_name)
+        atlas_manager_with_config.add_textures(collection_name, [
+            AtlasTexture(path=test_image_file_path, label=str(i), row=0, column=i) for i in range(3)
+        ])
+
+    atlas_manager_with_config.delete_collection("test")
+    atlas_manager_with_config.delete_collection("unknown")
+
+    assert atlas_manager_with_config.list_collections() == ["other"]
+    assert len(atlas_manager_with_config.load_textures("other")) == 3
+
+
+@delete_file_after_done(sqlite_file_path)
+def test_delete_collection_incremental_vacuum():
+    atlas_manager = AtlasManager(AtlasManagerConfig(
+        db=AtlasManagerConfigDB(
+            sqlite_path=sqlite_file_path,
+            pragmas=AtlasManagerConfigDBPragmas(auto_vacuum="INCREMENTAL"),
+        ),
+    ))
+    for collection_name in ("other", "test"):
+        atlas_manager.create_collection(collection_name)
+        atlas_manager.add_textures(collection_name, [
+            AtlasTexture(path=test_image_file_path, label=f"texture {i}" * 10, row=0, column=i) for i in range(2000)
+        ])
+
+    atlas_manager.delete_collection("other")
+
+    with atlas_manager.db_engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA freelist_count").scalar() > 1
+    size_before = os.path.getsize(sqlite_file_path)
+
+    atlas_manager.delete_collection("test", vacuum=True)
+
+    with atlas_manager.db_engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA freelist_count").scalar() == 0
+    assert os.path.getsize(sqlite_file_path) < size_before
+    atlas_manager.close_all_connections()
+
+
 def test_list_collections(atlas_manager_with_config: AtlasManager):
     COLLECTION_NAME = "test"
     CREATE_COLLECTIONS = 3
@@ -130,6 +176,74 @@ def test_add_texture(atlas_manager_with_config: AtlasManager):
     atlas_manager_with_config.add_texture(atlas_collection.name, atlas_texture)
 
 
+def test_add_textures(atlas_manager_with_config: AtlasManager):
+    atlas_collection = AtlasCollection("test")
+    atlas_textures = [
+        atlas_collection.add_texture(AtlasTextureModel(path=test_image_file_path, label=f"test{i}"))
+        for i in range(5)
+    ]
+    atlas_manager_with_config.create_collection(atlas_collection)
+    progress = []
+
+    inserted = atlas_manager_with_config.add_textures(
+        atlas_collection.name,
+        atlas_textures,
+        chunk_size=2,
+        on_progress=progress.append,
+    )
+
+    assert inserted == 5
+    assert progress == [2, 4, 5]
+    assert atlas_manager_with_config.load_collection(atlas_collection.name).textures == atlas_collection.textures
+
+
+def test_load_collection_keeps_coords_and_skips_validation(atlas_manager_with_config: AtlasManager):
+    atlas_collection = AtlasCollection("test")
+    atlas_textures = [
+        atlas_collection.add_texture(AtlasTextureModel(path=test_image_file_path, label=f"test{i}"))
+        for i in range(10)
+    ]
+    missing_texture = AtlasTexture.construct(path=Path("missing.png"), label="missing")
+    atlas_collection.texture_store.add(missing_texture)
+    atlas_manager_with_config.create_collection(atlas_collection)
+    atlas_manager_with_config.add_textures(atlas_collection.name, atlas_textures + [missing_texture])
+
+    loaded_atlas_collection = atlas_manager_with_config.load_collection(atlas_collection.name)
+
+    assert loaded_atlas_collection.textures == atlas_collection.textures
+    assert loaded_atlas_collection.get_texture(row=missing_texture.row, column=missing_texture.column).label == "missing"
+
+    next_texture_model = AtlasTextureModel(path=test_image_file_path, label="next")
+    next_texture = atlas_collection.add_texture(next_texture_model)
+    assert loaded_atlas_collection.add_texture(next_texture_model).get_coord() == next_texture.get_coord()
+
+    with pytest.raises(pydantic.ValidationError):
+        atlas_manager_with_config.load_collection(atlas_collection.name, validate=True)
+
+
+@pytest.mark.parametrize("stored_coords", [[(0, 0), (2, 0), (4, 0)], [(0, 0), (1, 0), (2, 0)]])
+@pytest.mark.parametrize("validate", [False, True])
+def test_load_collection_places_textures_off_the_grid_again(
+    atlas_manager_with_config: AtlasManager,
+    stored_coords: list[tuple[int, int]],
+    validate: bool,
+):
+    atlas_manager_with_config.create_collection("test")
+    atlas_manager_with_config.add_textures("test", [
+        AtlasTexture(path=test_image_file_path, label=f"test{i}", row=row, column=column)
+        for i, (row, column) in enumerate(stored_coords)
+    ])
+
+    atlas_collection = atlas_manager_with_config.load_collection("test", validate=validate)
+
+    loaded_textures = [atlas_collection.find_by_label(f"test{i}") for i in range(3)]
+    assert [(texture.row, texture.column) for texture in loaded_textures] == [(0, 0), (1, 0), (0, 1)]
+
+    next_texture = atlas_collection.add_texture(AtlasTextureModel(path=test_image_file_path, label="next"))
+    assert (next_texture.row, next_texture.column) == (1, 1)
+    assert len(atlas_collection.textures) == 4
+
+
 def test_load_textures(atlas_manager_with_config: AtlasManager):
     COLLECTION_NAME = "test"
 
@@ -181,6 +295,171 @@ def test_update_texture(atlas_manager_with_config: AtlasManager):
     assert atlas_texture3.path == UPDATE_TEXTURE_PATH
 
 
+def test_update_textures(atlas_manager_with_config: AtlasManager):
+    for collection_name in ["test", "other"]:
+        atlas_manager_with_config.create_collection(collection_name)
+        atlas_manager_with_config.add_textures(collection_name, [
+            AtlasTexture(path=test_image_file_path, label=str(i), row=0, column=i) for i in range(5)
+        ])
+
+    updated = atlas_manager_with_config.update_textures("test", [
+        AtlasTexture(path=test_image_file_path2, label="0", row=0, column=0),
+        AtlasTexture(path=test_image_file_path, label="new", row=0, column=1),
+        AtlasTexture(path=test_image_file_path, label="2", row=0, column=2),
+        AtlasTexture(path=test_image_file_path, label="missing", row=1, column=0),
+    ], chunk_size=2)
+
+    assert updated == 2
+    textures = atlas_manager_with_config.load_textures("test")
+    assert [texture.path for texture in textures] == [test_image_file_path2] + [test_image_file_path] * 4
+    assert [texture.label for texture in textures] == ["0", "new", "2", "3", "4"]
+    assert [texture.label for texture in atlas_manager_with_config.load_textures("other")] == list("01234")
+
+
+def test_iter_textures(atlas_manager_with_config: AtlasManager):
+    atlas_manager_with_config.create_collection("empty")
+    atlas_manager_with_config.create_collection("test")
+    atlas_manager_with_config.add_textures("test", [
+        AtlasTexture(path=test_image_file_path, label=str(i), row=0, column=i) for i in range(7)
+    ])
+
+    textures = list(atlas_manager_with_config.iter_textures("test", batch_size=3))
+
+    assert textures == atlas_manager_with_config.load_textures("test")
+    assert list(atlas_manager_with_config.iter_textures("empty")) == []
+    assert list(atlas_manager_with_config.iter_textures("unknown")) == []
+
+
+def test_load_textures_window(atlas_manager_with_config: AtlasManager):
+    atlas_collection = AtlasCollection("test")
+    for i in range(16):
+        atlas_collection.add_texture(AtlasTextureModel(path=test_image_file_path, label=str(i)))
+    atlas_manager_with_config.create_collection(atlas_collection.name)
+    atlas_manager_with_config.add_textures(atlas_collection.name, atlas_collection)
+
+    window = atlas_manager_with_config.load_textures_window("test", rows=range(1, 3), columns=range(2, 4))
+    assert sorted((texture.row, texture.column) for texture in window) == [(1, 2), (1, 3), (2, 2), (2, 3)]
+    assert all(texture == atlas_collection.get_texture(texture.row, texture.column) for texture in window)
+
+    window = atlas_manager_with_config.load_textures_window("test", rows=range(0, 4, 2), columns=range(4))
+    assert sorted((texture.row, texture.column) for texture in window) == [(0, c) for c in range(4)] + [
+        (2, c) for c in range(4)
+    ]
+    assert atlas_manager_with_config.load_textures_window("test", rows=range(0), columns=range(4)) == []
+
+
+def test_transaction(atlas_manager_with_config: AtlasManager):
+    with atlas_manager_with_config.transaction() as session:
+        atlas_manager_with_config.create_collection("test")
+        atlas_manager_with_config.add_texture("test", AtlasTexture(path=test_image_file_path, label="test"))
+
+        with atlas_manager_with_config.transaction() as nested_session:
+            assert nested_session is session
+            assert atlas_manager_with_config.list_collections() == ["test"]
+
+    assert len(atlas_manager_with_config.load_textures("test")) == 1
+
+
+def test_transaction_rollback(atlas_manager_with_config: AtlasManager):
+    with pytest.raises(RuntimeError):
+        with atlas_manager_with_config.transaction():
+            atlas_manager_with_config.create_collection("test")
+            raise RuntimeError
+
+    assert atlas_manager_with_config.list_collections() == []
+
+
+@delete_file_after_done(sqlite_file_path)
+def test_atlas_manager_pool_config():
+    atlas_manager = AtlasManager(AtlasManagerConfig(
+        db=AtlasManagerConfigDB(sqlite_path=sqlite_file_path, pool_size=2, pool_timeout=5),
+    ))
+
+    assert atlas_manager.db_engine.pool.size() == 2
+    assert atlas_manager.db_engine.pool.timeout() == 5
+    atlas_manager.close_all_connections()
+
+
+@delete_file_after_done(sqlite_file_path)
+def test_atlas_manager_performance_profile():
+    atlas_manager = AtlasManager(AtlasManagerConfig(
+        db=AtlasManagerConfigDB(
+            sqlite_path=sqlite_file_path,
+            profile="performance",
+            pragmas=AtlasManagerConfigDBPragmas(cache_size=-1024),
+        ),
+    ))
+
+    with atlas_manager.db_engine.connect() as connection:
+        def pragma(name: str):
+            return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1
+        assert pragma("temp_store") == 2
+        assert pragma("cache_size") == -1024
+
+    atlas_manager.close_all_connections()
+    delete_file(f"{sqlite_file_path}-wal")
+    delete_file(f"{sqlite_file_path}-shm")
+
+
+def create_unindexed_db(file_path: str, collection_names: list[str]):
+    connection = sqlite3.connect(file_path)
+    connection.executescript("""
+        CREATE TABLE collection (name VARCHAR NOT NULL, id INTEGER NOT NULL, PRIMARY KEY (id));
+        CREATE TABLE texture (
+            label VARCHAR NOT NULL, "column" INTEGER NOT NULL, "row" INTEGER NOT NULL, id INTEGER NOT NULL,
+            collection_id INTEGER, path VARCHAR NOT NULL,
+            PRIMARY KEY (id), FOREIGN KEY(collection_id) REFERENCES collection (id)
+        );
+    """)
+    connection.executemany("INSERT INTO collection (name) VALUES (?)", [(name,) for name in collection_names])
+    connection.commit()
+    connection.close()
+
+
+def db_index_names(file_path: str) -> set[str]:
+    connection = sqlite3.connect(file_path)
+    index_names = {name for name, in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    connection.close()
+
+    return index_names
+
+
+@delete_file_after_done(sqlite_file_path)
+def test_atlas_manager_migrates_old_db(atlas_manager_config: AtlasManagerConfig):
+    create_unindexed_db(sqlite_file_path, ["test"])
+
+    atlas_manager = AtlasManager(atlas_manager_config)
+    atlas_manager.close_all_connections()
+
+    assert {"ix_collection_name", "ix_texture_collection_id_row_column"} <= db_index_names(sqlite_file_path)
+    assert atlas_manager.list_collections() == ["test"]
+    with pytest.raises(sqlalchemy.exc.IntegrityError):
+        atlas_manager.create_collection("test")
+    atlas_manager.close_all_connections()
+
+
+@delete_file_after_done(sqlite_file_path)
+def test_atlas_manager_migrates_old_db_with_duplicate_names(atlas_manager_config: AtlasManagerConfig):
+    create_unindexed_db(sqlite_file_path, ["test", "test"])
+
+    with pytest.warns(UserWarning):
+        atlas_manager = AtlasManager(atlas_manager_config)
+    atlas_manager.close_all_connections()
+
+    index_names = db_index_names(sqlite_file_path)
+    assert "ix_texture_collection_id_row_column" in index_names
+    assert "ix_collection_name" not in index_names
+
+    atlas_manager.update_collection("test", AtlasCollection("test2"))
+    atlas_manager.close_all_connections()
+    AtlasManager(atlas_manager_config).close_all_connections()
+
+    assert "ix_collection_name" in db_index_names(sqlite_file_path)
+
+
 class DeleteFile:
     def __init__(self, file_path: str):
         self.file_path = Path(file_path)
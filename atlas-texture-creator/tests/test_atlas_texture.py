@@ -3,7 +3,7 @@ from pathlib import Path
 import pydantic.error_wrappers
 import pytest
 
-from atlas_texture_creator import AtlasTexture, AtlasTextureModel
+from atlas_texture_creator import AtlasCollection, AtlasTexture, AtlasTextureModel, path_validation
 from atlas_texture_creator.types import AtlasGridItem
 from tests.conftest import test_image_file_path, mock_dir
 
@@ -119,3 +119,26 @@ def test_update_123(atlas_texture: AtlasTexture):
     atlas_texture.update(atlas_texture_model)
 
     assert atlas_texture.get_data() == atlas_texture_model
+
+
+def test_create_atlas_texture_with_lazy_path_validation(tmp_path: Path):
+    missing_path = tmp_path / "missing.png"
+
+    with path_validation("lazy"):
+        atlas_texture = AtlasTexture(path=missing_path, label="test")
+        atlas_texture.update(AtlasTextureModel(path=tmp_path, label="test2"))
+
+    assert atlas_texture.path == tmp_path
+    with pytest.raises(pydantic.error_wrappers.ValidationError):
+        AtlasTexture(path=missing_path, label="test")
+
+
+def test_validate_paths(tmp_path: Path):
+    atlas_collection = AtlasCollection("test")
+    atlas_collection.add_texture(AtlasTextureModel(path=test_image_file_path, label="test"))
+
+    with path_validation("lazy"):
+        missing_texture = atlas_collection.add_texture(AtlasTextureModel(path=tmp_path / "missing.png", label="missing"))
+        atlas_collection.add_texture(AtlasTextureModel(path=tmp_path / "missing.png", label="missing2"))
+
+    assert atlas_collection.validate_paths(workers=2) == [missing_texture, atlas_collection.get_texture(row=0, column=1)]
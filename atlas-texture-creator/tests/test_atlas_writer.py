@@ -0,0 +1,57 @@
+import io
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from atlas_texture_creator.atlas_writer import AtlasStreamWriter, PNGStreamWriter, get_stream_writer
+from atlas_texture_creator.types import GenerateAtlasOptions
+from tests.conftest import create_image_collection, create_random_images
+
+
+@pytest.mark.parametrize("band_height", [1, 7, 1000])
+@pytest.mark.parametrize("options", [
+    GenerateAtlasOptions(),
+    GenerateAtlasOptions(packer="maxrects", padding=1, extrude=2, allow_rotation=True, workers=2),
+])
+def test_save_atlas_streaming(tmp_path: Path, band_height: int, options: GenerateAtlasOptions):
+    atlas_collection = create_image_collection(tmp_path, create_random_images(20, 24))
+    atlas_image, texture_coords = atlas_collection.generate_atlas(options)
+
+    file_paths, streamed_texture_coords = atlas_collection.save_atlas_streaming(
+        tmp_path / "atlas.png",
+        options,
+        band_height=band_height,
+    )
+
+    assert streamed_texture_coords.json() == texture_coords.json()
+    with Image.open(file_paths[0]) as img:
+        assert img.mode == "RGBA"
+        assert img.tobytes() == atlas_image.tobytes()
+
+
+def test_save_atlas_streaming_raw(tmp_path: Path):
+    atlas_collection = create_image_collection(tmp_path, create_random_images(5, 24))
+    atlas_image, _ = atlas_collection.generate_atlas()
+
+    file_paths, _ = atlas_collection.save_atlas_streaming(tmp_path / "atlas.raw", image_format="raw", band_height=3)
+
+    assert file_paths[0].read_bytes() == atlas_image.tobytes()
+
+
+def test_stream_writer_checks_rows():
+    f = io.BytesIO()
+
+    with pytest.raises(ValueError):
+        with PNGStreamWriter(f, (4, 4)) as writer:
+            writer.write_band(Image.new("RGBA", (4, 5)))
+
+    with pytest.raises(ValueError):
+        with PNGStreamWriter(f, (4, 4)) as writer:
+            writer.write_band(Image.new("RGBA", (4, 2)))
+
+    with pytest.raises(ValueError):
+        get_stream_writer("bmp", f, (4, 4))
+
+    with pytest.raises(TypeError):
+        AtlasStreamWriter(f, (4, 4))
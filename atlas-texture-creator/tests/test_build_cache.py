@@ -0,0 +1,57 @@
+import os
+from pathlib import Path
+
+from PIL import Image
+
+from atlas_texture_creator import AtlasCollection
+from atlas_texture_creator.build_cache import AtlasBuildCache
+from atlas_texture_creator.types import GenerateAtlasOptions
+from tests.conftest import create_image_collection, create_solid_images
+
+
+def test_generate_atlas_with_cache(tmp_path: Path, monkeypatch):
+    cache = AtlasBuildCache(tmp_path / "cache")
+    atlas_collection = create_image_collection(tmp_path, create_solid_images([(8, 8), (4, 16)]))
+    options = GenerateAtlasOptions(packer="shelf")
+
+    atlas_image, texture_coords = atlas_collection.generate_atlas(options, cache=cache)
+    assert atlas_collection.atlas_build_key(options) in cache
+
+    monkeypatch.setattr(AtlasCollection, "generate_atlas_layout", None)
+    cached_atlas_image, cached_texture_coords = atlas_collection.generate_atlas(options, cache=cache)
+    monkeypatch.undo()
+
+    assert cached_atlas_image.tobytes() == atlas_image.tobytes()
+    assert cached_texture_coords.json() == texture_coords.json()
+
+    assert atlas_collection.atlas_build_key(options) == atlas_collection.atlas_build_key(options.copy(update={"workers": 4}))
+    assert atlas_collection.atlas_build_key(options) != atlas_collection.atlas_build_key(GenerateAtlasOptions())
+
+    Image.new("RGBA", (8, 8), "blue").save(tmp_path / "0.png")
+    stat = os.stat(tmp_path / "0.png")
+    os.utime(tmp_path / "0.png", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    atlas_image, texture_coords = atlas_collection.generate_atlas(options, cache=cache)
+    coord = texture_coords.data["0"]
+
+    assert atlas_image.getpixel((coord.x, coord.y)) == (0, 0, 255, 255)
+    assert len(cache) == 2
+
+
+def test_build_cache_evicts_least_recently_used(tmp_path: Path):
+    cache = AtlasBuildCache(tmp_path / "cache")
+    atlas_collection = create_image_collection(tmp_path, create_solid_images([(8, 8)]))
+    atlas_image, texture_coords = atlas_collection.generate_atlas()
+
+    for i, key in enumerate(("a", "b", "c")):
+        cache.put(key, atlas_image, texture_coords)
+        os.utime(cache.cache_dir / f"{key}.png", ns=(i, i))
+
+    cache.get("a")
+    entry_bytes = sum(file_path.stat().st_size for file_path in cache.cache_dir.iterdir()) // 3
+    cache.max_bytes = entry_bytes * 2
+    cache.evict()
+
+    assert sorted(cache) == ["a", "c"]
+
+    cache.clear()
+    assert len(cache) == 0
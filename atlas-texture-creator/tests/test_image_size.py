@@ -0,0 +1,45 @@
+import os
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from atlas_texture_creator.image_size import ImageSizeCache, get_image_size, probe_image_size
+from tests.conftest import test_image_file_path, test_image_file_path2
+
+
+@pytest.mark.parametrize("file_name,mode", [
+    ("texture.png", "RGBA"),
+    ("texture.jpg", "RGB"),
+    ("texture.bmp", "RGB"),
+    ("texture.tga", "RGBA"),
+    ("texture.gif", "P"),
+])
+def test_probe_image_size(tmp_path: Path, file_name: str, mode: str):
+    file_path = tmp_path / file_name
+    Image.new(mode, (37, 19)).save(file_path)
+
+    with Image.open(file_path) as img:
+        assert probe_image_size(file_path) == img.size
+
+
+def test_probe_image_size_of_mock_images():
+    for file_path in (test_image_file_path, test_image_file_path2):
+        with Image.open(file_path) as img:
+            assert get_image_size(file_path) == img.size
+
+
+def test_image_size_cache_invalidates_on_change(tmp_path: Path):
+    file_path = tmp_path / "texture.png"
+    image_size_cache = ImageSizeCache()
+
+    Image.new("RGBA", (8, 4)).save(file_path)
+    assert image_size_cache.get(file_path) == (8, 4)
+    assert len(image_size_cache) == 1
+
+    Image.new("RGBA", (16, 32)).save(file_path)
+    stat = os.stat(file_path)
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    assert image_size_cache.get(file_path) == (16, 32)
+    assert len(image_size_cache) == 1
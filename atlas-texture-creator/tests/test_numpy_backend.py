@@ -0,0 +1,57 @@
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from atlas_texture_creator.atlas_collection import AtlasGrid
+from atlas_texture_creator.types import GenerateAtlasOptions, GenerateAtlasOptionsSize
+from tests.conftest import create_image_collection, create_random_images
+
+np = pytest.importorskip("numpy")
+
+from atlas_texture_creator.numpy_backend import premultiply  # noqa: E402
+
+
+@pytest.mark.parametrize("options", [
+    GenerateAtlasOptions(),
+    GenerateAtlasOptions(premultiply_alpha=True),
+    GenerateAtlasOptions(packer="maxrects", padding=2, extrude=3, allow_rotation=True, power_of_two=True),
+    GenerateAtlasOptions(lock_size=GenerateAtlasOptionsSize(width=8, height=4), extrude=1, premultiply_alpha=True),
+])
+def test_numpy_backend_is_byte_identical(tmp_path: Path, options: GenerateAtlasOptions):
+    atlas_collection = create_image_collection(tmp_path, create_random_images(30, 16))
+
+    atlas_image, texture_coords = atlas_collection.generate_atlas(options)
+    numpy_atlas_image, numpy_texture_coords = atlas_collection.generate_atlas(options.copy(update={"backend": "numpy"}))
+
+    assert numpy_atlas_image.mode == atlas_image.mode
+    assert numpy_atlas_image.size == atlas_image.size
+    assert numpy_atlas_image.tobytes() == atlas_image.tobytes()
+    assert numpy_texture_coords.json() == texture_coords.json()
+
+
+def test_premultiply_matches_pillow():
+    values = np.arange(256, dtype=np.uint8)
+    canvas = np.stack(np.meshgrid(values, values), axis=-1)[..., [0, 0, 0, 1]].copy()
+    expected = np.asarray(Image.fromarray(canvas).convert("RGBa"))
+
+    premultiply(canvas)
+
+    assert np.array_equal(canvas, expected)
+
+
+@pytest.mark.parametrize("direction", ["row", "column"])
+def test_atlas_grid_allocate(direction: str):
+    grid = AtlasGrid(direction=direction)
+    grid.set_length(7)
+
+    coords = grid.allocate(500)
+
+    assert coords.shape == (500, 2)
+    assert coords.tolist() == [list(grid.coord_of(index)) for index in range(7, 507)]
+    assert len(grid) == 507
+
+    big_index = 2 ** 52 - 1
+    assert grid.allocate(0).shape == (0, 2)
+    grid.set_length(big_index)
+    assert tuple(grid.allocate(1)[0]) == grid.coord_of(big_index)
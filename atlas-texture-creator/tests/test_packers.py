@@ -0,0 +1,232 @@
+import random
+
+import pytest
+from PIL import Image
+
+from atlas_texture_creator import AtlasCollection, AtlasTextureModel, packers
+from atlas_texture_creator.packers import AtlasBinPacker, AtlasPacker, AtlasPackerRect, AtlasPackerPlacement, \
+    PACKERS, get_packer, next_power_of_two
+from atlas_texture_creator.types import GenerateAtlasOptions
+from tests.conftest import create_image_collection, create_random_images, create_solid_images
+
+
+def create_rects(count: int) -> list[AtlasPackerRect]:
+    rnd = random.Random(count)
+
+    return [
+        AtlasPackerRect(width=rnd.randint(1, 64), height=rnd.randint(1, 64), row=i, column=0)
+        for i in range(count)
+    ]
+
+
+def placed_boxes(rects: list[AtlasPackerRect], placements: list[AtlasPackerPlacement]):
+    for rect, placement in zip(rects, placements):
+        width, height = (rect.height, rect.width) if placement.rotated else (rect.width, rect.height)
+        yield placement.x, placement.y, placement.x + width, placement.y + height
+
+
+def assert_no_overlaps(boxes):
+    boxes = sorted(boxes)
+
+    for i, box in enumerate(boxes):
+        assert box[0] >= 0 and box[1] >= 0
+
+        for other in boxes[i + 1:]:
+            if other[0] >= box[2]:
+                break
+            assert other[1] >= box[3] or other[3] <= box[1], f"{box} overlaps {other}"
+
+
+@pytest.mark.parametrize("packer_name", ["shelf", "skyline", "maxrects"])
+@pytest.mark.parametrize("allow_rotation", [False, True])
+def test_packer_places_rects_without_overlaps(packer_name: str, allow_rotation: bool):
+    rects = create_rects(300)
+    packer = get_packer(packer_name, allow_rotation=allow_rotation)
+
+    placements = packer.pack(rects)
+
+    assert len(placements) == len(rects)
+    assert_no_overlaps(list(placed_boxes(rects, placements)))
+    if not allow_rotation:
+        assert not any(placement.rotated for placement in placements)
+
+
+def test_packer_skips_pages_a_size_did_not_fit_into(monkeypatch):
+    rnd = random.Random(0)
+    rects = [AtlasPackerRect(width=rnd.randint(8, 64), height=rnd.randint(8, 64), row=i, column=0) for i in range(20000)]
+    inserts = 0
+    insert = packers._SkylineBin.insert
+
+    def counted_insert(self, orientations):
+        nonlocal inserts
+        inserts += 1
+        return insert(self, orientations)
+
+    monkeypatch.setattr(packers._SkylineBin, "insert", counted_insert)
+    placements = get_packer("skyline", allow_rotation=True, max_size=512).pack(rects)
+
+    pages = max(placement.page for placement in placements) + 1
+    sizes = len({(rect.width, rect.height) for rect in rects})
+    assert pages > 50
+    # every rect fits on its first try, apart from a single miss per size and page
+    assert inserts <= len(rects) + sizes * pages
+
+
+def test_maxrects_packs_many_rects_with_skyline():
+    rects = create_rects(300)
+    packer = get_packer("maxrects", allow_rotation=True)
+    packer.max_rects = 100
+
+    with pytest.warns(UserWarning, match="skyline"):
+        placements = packer.pack(rects)
+
+    assert placements == get_packer("skyline", allow_rotation=True).pack(rects)
+
+
+def test_packers_are_registered():
+    assert set(PACKERS) == {"grid", "shelf", "skyline", "maxrects"}
+
+    with pytest.raises(ValueError):
+        get_packer("unknown")
+
+
+def test_packer_bases_are_abstract():
+    with pytest.raises(TypeError):
+        AtlasPacker()
+
+    with pytest.raises(TypeError):
+        AtlasBinPacker()
+
+
+def test_next_power_of_two():
+    assert [next_power_of_two(value) for value in (0, 1, 2, 3, 64, 65)] == [1, 1, 2, 4, 64, 128]
+
+
+def test_generate_atlas_with_packer_padding_and_extrude(tmp_path):
+    padding = 2
+    extrude = 1
+    atlas_collection = create_image_collection(tmp_path, [
+        Image.new("RGBA", size, color) for size, color in (((8, 4), "red"), ((3, 9), "green"), ((5, 5), "blue"))
+    ])
+
+    atlas_image, texture_coords = atlas_collection.generate_atlas(GenerateAtlasOptions(
+        packer="maxrects",
+        padding=padding,
+        extrude=extrude,
+        power_of_two=True,
+    ))
+
+    width, height = atlas_image.size
+    assert width == next_power_of_two(width)
+    assert height == next_power_of_two(height)
+
+    boxes = []
+    for label, coord in texture_coords:
+        color = atlas_image.getpixel((coord.x, coord.y))
+        assert atlas_image.getpixel((coord.x - extrude, coord.y - extrude)) == color
+        assert atlas_image.getpixel((coord.x + coord.width, coord.y + coord.height - 1)) == color
+        boxes.append((
+            coord.x - extrude,
+            coord.y - extrude,
+            coord.x + coord.width + extrude + padding,
+            coord.y + coord.height + extrude + padding,
+        ))
+
+    assert_no_overlaps(boxes)
+
+
+def test_generate_atlas_with_rotation(tmp_path):
+    file_path = tmp_path / "texture.png"
+    img = Image.new("RGBA", (2, 6), "red")
+    img.putpixel((0, 0), (0, 0, 255, 255))
+    img.save(file_path)
+
+    file_path2 = tmp_path / "texture2.png"
+    Image.new("RGBA", (10, 10), "green").save(file_path2)
+
+    atlas_collection = AtlasCollection("test")
+    atlas_collection.add_texture(AtlasTextureModel(path=file_path, label="texture"))
+    atlas_collection.add_texture(AtlasTextureModel(path=file_path2, label="texture2"))
+
+    atlas_image, texture_coords = atlas_collection.generate_atlas(GenerateAtlasOptions(
+        packer="shelf",
+        allow_rotation=True,
+    ))
+    coord = texture_coords.data["texture"]
+
+    assert coord.rotated
+    assert (coord.width, coord.height) == (6, 2)
+    # rotated clockwise: the top left pixel ends up top right
+    assert atlas_image.getpixel((coord.x + coord.width - 1, coord.y)) == (0, 0, 255, 255)
+    assert '"rotated": true' in texture_coords.json()
+
+
+@pytest.mark.parametrize("packer_name", ["grid", "shelf", "skyline", "maxrects"])
+def test_generate_atlas_pages_with_max_size(tmp_path, packer_name: str):
+    max_size = 40
+    atlas_collection = create_image_collection(tmp_path, create_solid_images([(16, 16)] * 12))
+    options = GenerateAtlasOptions(packer=packer_name, max_size=max_size)
+
+    atlas_pages, texture_coords = atlas_collection.generate_atlas_pages(options)
+
+    assert len(atlas_pages) > 1
+    assert all(page.width <= max_size and page.height <= max_size for page in atlas_pages)
+
+    for page, atlas_page in enumerate(atlas_pages):
+        boxes = []
+        for label, coord in texture_coords:
+            if coord.page != page:
+                continue
+            assert atlas_page.getpixel((coord.x, coord.y)) == (255, 0, 0, 255)
+            boxes.append((coord.x, coord.y, coord.x + coord.width, coord.y + coord.height))
+        assert boxes
+        assert_no_overlaps(boxes)
+
+    with pytest.raises(ValueError):
+        atlas_collection.generate_atlas(options)
+
+
+def test_generate_atlas_texture_bigger_than_max_size(tmp_path):
+    atlas_collection = create_image_collection(tmp_path, create_solid_images([(16, 16), (64, 8)]))
+
+    with pytest.raises(ValueError):
+        atlas_collection.generate_atlas_layout(GenerateAtlasOptions(packer="shelf", max_size=32))
+
+
+@pytest.mark.parametrize("packer_name", ["grid", "shelf", "skyline", "maxrects"])
+@pytest.mark.parametrize("padding", [0, 3])
+def test_generate_atlas_power_of_two_pages_stay_within_max_size(tmp_path, packer_name: str, padding: int):
+    max_size = 100
+    atlas_collection = create_image_collection(tmp_path, create_random_images(40, 30))
+    options = GenerateAtlasOptions(packer=packer_name, power_of_two=True, max_size=max_size, padding=padding)
+
+    layout = atlas_collection.generate_atlas_layout(options)
+
+    assert len(layout.page_sizes) > 1
+    for width, height in layout.page_sizes:
+        assert width <= max_size and height <= max_size
+        assert width == next_power_of_two(width) and height == next_power_of_two(height)
+
+
+@pytest.mark.parametrize("packer_name", ["grid", "shelf", "skyline", "maxrects"])
+def test_generate_atlas_trailing_padding_does_not_count_against_max_size(tmp_path, packer_name: str):
+    atlas_collection = create_image_collection(tmp_path, create_solid_images([(100, 100)]))
+
+    layout = atlas_collection.generate_atlas_layout(GenerateAtlasOptions(packer=packer_name, max_size=100, padding=2))
+
+    assert layout.page_sizes == [(100, 100)]
+
+
+def test_save_atlas_pages(tmp_path):
+    atlas_collection = create_image_collection(tmp_path, create_solid_images([(16, 16)] * 5))
+
+    page_file_paths, texture_coords = atlas_collection.save_atlas_pages(
+        tmp_path / "atlas.png",
+        GenerateAtlasOptions(packer="shelf", max_size=32),
+    )
+
+    assert [file_path.name for file_path in page_file_paths] == ["atlas_0.png", "atlas_1.png"]
+    assert {coord.page for label, coord in texture_coords} == {0, 1}
+    for file_path in page_file_paths:
+        with Image.open(file_path) as img:
+            assert img.size == (32, 32) or img.size == (16, 16)